@@ -6,9 +6,22 @@
 import json
 import os
 import sys
-from datetime import datetime
+import fcntl
+import atexit
+import queue
+import struct
+import threading
+from datetime import datetime, timezone
+
+# orjson сразу отдаёт UTF-8 байты; если не установлен — работаем на json
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 LOG_FILE = "/opt/mcp-bridge/logs/actions.log"
+# Индекс: смещение начала каждой записи в LOG_FILE, 8 байт little-endian на запись
+LOG_INDEX_FILE = LOG_FILE + ".idx"
 os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
 
 # Настройки Telegram для уведомлений
@@ -32,6 +45,101 @@ def send_telegram_error(message: str):
     except Exception as e:
         print(f"Не удалось отправить в Telegram: {e}", file=sys.stderr)
 
+# Уведомления уходят из фонового потока: запрос к Telegram (до 5 с) не должен
+# задерживать того, кто пишет в лог
+_notify_queue = queue.Queue()
+_notify_thread = None
+_notify_lock = threading.Lock()
+
+def _notify_worker():
+    while True:
+        message = _notify_queue.get()
+        if message is None:
+            return
+        send_telegram_error(message)
+
+def _notify_async(message):
+    global _notify_thread
+    with _notify_lock:
+        if _notify_thread is None:
+            _notify_thread = threading.Thread(target=_notify_worker, name="telegram-notify", daemon=True)
+            _notify_thread.start()
+    _notify_queue.put(message)
+
+@atexit.register
+def _flush_notifications():
+    """Даём отправить накопленные уведомления перед выходом, но не дольше нескольких секунд."""
+    if _notify_thread is not None:
+        _notify_queue.put(None)
+        # Поток-демон: неотправленное за это время пропадает вместе с процессом, выход не задерживается
+        _notify_thread.join(timeout=3)
+
+def _append_index(offset):
+    """Дописывает смещение в индекс. Отсутствующий индекс не создаём — его перестроит веб-панель."""
+    try:
+        # Без O_CREAT: открытие само проверяет, что индекс есть, — без отдельного stat
+        fd = os.open(LOG_INDEX_FILE, os.O_WRONLY | os.O_APPEND)
+    except FileNotFoundError:
+        return
+    except OSError as e:
+        print(f"LOG INDEX ERROR: {e}", file=sys.stderr)
+        return
+    try:
+        os.write(fd, struct.pack("<Q", offset))
+    except OSError as e:
+        print(f"LOG INDEX ERROR: {e}", file=sys.stderr)
+    finally:
+        os.close(fd)
+
+# Дескриптор лога открывается один раз на процесс, а не на каждую запись
+_log_fd = None
+# flock не разделяет потоки одного процесса — их упорядочивает обычная блокировка
+_log_lock = threading.Lock()
+
+def _lock_current_log():
+    """
+    Дескриптор лога на дозапись, уже под LOCK_EX, и размер файла (смещение новой записи).
+    log_rotator подменяет лог под той же блокировкой и оставляет старый файл без имени:
+    если после ожидания блокировки у файла st_nlink == 0, лог переоткрывается по имени.
+    Признак берётся из fstat, который всё равно нужен для смещения, — отдельного stat на запись нет.
+    """
+    global _log_fd
+    while True:
+        if _log_fd is None:
+            _log_fd = os.open(LOG_FILE, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        fcntl.flock(_log_fd, fcntl.LOCK_EX)
+        st = os.fstat(_log_fd)
+        if st.st_nlink:
+            return _log_fd, st.st_size
+        os.close(_log_fd)  # Закрытие снимает и блокировку
+        _log_fd = None
+
+@atexit.register
+def _close_log_fd():
+    if _log_fd is not None:
+        os.close(_log_fd)
+
+def _encode_record(record):
+    if orjson is not None:
+        return orjson.dumps(record, option=orjson.OPT_NON_STR_KEYS) + b"\n"
+    return (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+def write_record(record: dict):
+    """
+    Дописывает готовую запись в лог и её смещение в индекс.
+    Все, кто пишет в LOG_FILE, должны идти через эту функцию: запись в обход
+    блокировки и индекса веб-панель не увидит при постраничном чтении.
+    """
+    line = _encode_record(record)
+    with _log_lock:
+        # Запись и её смещение в индексе добавляются под одной блокировкой
+        fd, offset = _lock_current_log()
+        try:
+            os.write(fd, line)
+            _append_index(offset)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
 def log_action(
     source: str,
     action: str,
@@ -41,7 +149,7 @@ def log_action(
     details: dict = None
 ):
     record = {
-        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
         "source": source,
         "user": user,
         "action": action,
@@ -51,13 +159,12 @@ def log_action(
     }
     
     try:
-        with open(LOG_FILE, "a", encoding="utf-8") as f:
-            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        write_record(record)
         
         # Отправляем уведомление при критической ошибке
         if not success and source in ("mcp", "scheduler"):
             error_msg = f"<b>{source.upper()}</b>\nДействие: {action}\nЦель: {target}\nДетали: {json.dumps(details, ensure_ascii=False)}"
-            send_telegram_error(error_msg)
+            _notify_async(error_msg)
             
     except Exception as e:
         print(f"LOG ERROR: {e}", file=sys.stderr)
\ No newline at end of file
@@ -2,7 +2,7 @@
 import json
 import os
 import urllib.request
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
 GITHUB_REPO = "golnet1/mcp-majordomo-xiaozhi"  # ← РЕПОЗИТОРИЙ
 VERSION_FILE = "/opt/mcp-bridge/VERSION"
@@ -29,7 +29,7 @@ def save_status(current, latest):
         "current_version": current,
         "latest_version": latest,
         "update_available": latest != current,
-        "last_check": datetime.utcnow().isoformat() + "Z"
+        "last_check": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
     }
     with open(STATUS_FILE, "w") as f:
         json.dump(status, f, indent=2)
@@ -117,7 +117,7 @@ echo -e "${YELLOW}Установка Python-зависимостей...${NC}"
 "$PYTHON_CMD" -m venv "$INSTALL_DIR/.venv"
 
 # Устанавливаем зависимости через pip из виртуального окружения
-"$INSTALL_DIR/.venv/bin/pip" install --quiet websockets flask requests python-telegram-bot fastmcp python-dotenv requests
+"$INSTALL_DIR/.venv/bin/pip" install --quiet websockets flask requests python-telegram-bot fastmcp python-dotenv requests orjson gunicorn gevent flask-compress rcssmin rjsmin ijson
 
 # Убедитесь, что все зависимости установлены
 if ! /opt/mcp-bridge/.venv/bin/python -c "import requests" &> /dev/null; then
@@ -343,7 +343,7 @@ Type=simple
 User=$WHOAMI
 WorkingDirectory=/opt/mcp-bridge
 EnvironmentFile=/opt/mcp-bridge/.env
-ExecStart=/opt/mcp-bridge/.venv/bin/python3 /opt/mcp-bridge/web_panel.py
+ExecStart=/opt/mcp-bridge/.venv/bin/gunicorn -k gevent -w 2 --keep-alive 30 -b 0.0.0.0:5000 web_panel:app
 Restart=always
 
 [Install]
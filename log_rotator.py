@@ -6,9 +6,12 @@
 
 import os
 import json
-from datetime import datetime, timedelta
+import fcntl
+import shutil
+from datetime import datetime, timedelta, timezone
 
 LOG_FILE = "/opt/mcp-bridge/logs/actions.log"
+LOG_INDEX_FILE = LOG_FILE + ".idx"
 BACKUP_FILE = "/opt/mcp-bridge/logs/actions.log.bak"
 DAYS_TO_KEEP = 7
 
@@ -17,11 +20,15 @@ def rotate_logs():
         print("Лог-файл не найден")
         return
 
-    cutoff = datetime.utcnow() - timedelta(days=DAYS_TO_KEEP)
+    # Метки в логе — наивное UTC-время, поэтому и порог без часового пояса
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=DAYS_TO_KEEP)
     kept_lines = []
 
     try:
         with open(LOG_FILE, "r", encoding="utf-8") as f:
+            # Вся ротация идёт под LOCK_EX на лог: action_logger ждёт эту блокировку,
+            # а получив её, видит, что файл остался без имени, и переоткрывает новый лог
+            fcntl.flock(f, fcntl.LOCK_EX)
             for line in f:
                 line = line.strip()
                 if not line:
@@ -35,15 +42,22 @@ def rotate_logs():
                     # Сохраняем неразборчивые строки (на всякий)
                     kept_lines.append(line)
 
-        # Создаём резервную копию
-        if os.path.exists(LOG_FILE):
-            os.replace(LOG_FILE, BACKUP_FILE)
+            # Резервная копия — именно копия, а не переименование: старый файл должен
+            # остаться без имени (st_nlink == 0), по этому признаку писатели замечают ротацию
+            shutil.copyfile(LOG_FILE, BACKUP_FILE)
 
-        # Пишем обновлённый файл
-        with open(LOG_FILE, "w", encoding="utf-8") as f:
-            f.write("\n".join(kept_lines))
-            if kept_lines:
-                f.write("\n")
+            # Пишем обновлённый файл рядом и подменяем лог одним os.replace
+            tmp = LOG_FILE + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as out:
+                out.write("\n".join(kept_lines))
+                if kept_lines:
+                    out.write("\n")
+
+            # Смещения записей изменились — индекс перестроит веб-панель при следующем запросе.
+            # Удаляем до подмены: новый файл не должен ни мгновения соседствовать со старым индексом
+            if os.path.exists(LOG_INDEX_FILE):
+                os.remove(LOG_INDEX_FILE)
+            os.replace(tmp, LOG_FILE)
 
         print(f"Ротация завершена. Осталось записей: {len(kept_lines)}")
 
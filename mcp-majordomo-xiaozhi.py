@@ -30,6 +30,9 @@ except ImportError:
         pass  # Заглушка, если логгер недоступен
 
 # === Загрузка алиасов (новая структура) ===
+# Обратный индекс строится один раз на версию файла (mtime, размер, inode): inode меняется при замене файла
+_aliases_cache = {"state": None, "aliases": None}
+
 def load_aliases():
     """
     Загружает алиасы из нового формата:
@@ -46,8 +49,13 @@ def load_aliases():
     Поддерживает дублирующиеся имена в разных категориях.
     Возвращает: {"улица": [spec1], "комната отдыха": [spec_свет, spec_температура]}
     """
-    if not os.path.exists(ALIASES_FILE):
+    try:
+        st = os.stat(ALIASES_FILE)
+    except OSError:
         return {}
+    state = (st.st_mtime_ns, st.st_size, st.st_ino)
+    if _aliases_cache["state"] == state:
+        return _aliases_cache["aliases"]
     try:
         with open(ALIASES_FILE, "r", encoding="utf-8") as f:
             raw = json.load(f)
@@ -56,18 +64,20 @@ def load_aliases():
         for category, details in raw.items():
             if "devices" not in details:
                 continue
+            cat_type = details.get("type", "unknown")
             for key, spec in details["devices"].items():
-                names = [name.strip().lower() for name in key.split(",")]
-                for name in names:
+                # Одна спецификация на ключ, общая для всех его имён
+                entry = {
+                    "object": spec["object"],
+                    "property": spec["property"],
+                    "category": category,
+                    "type": cat_type
+                }
+                for name in key.split(","):
+                    name = name.strip().lower()
                     if name:
-                        if name not in aliases:
-                            aliases[name] = []
-                        aliases[name].append({
-                            "object": spec["object"],
-                            "property": spec["property"],
-                            "category": category,
-                            "type": details.get("type", "unknown")
-                        })
+                        aliases.setdefault(name, []).append(entry)
+        _aliases_cache.update(state=state, aliases=aliases)
         return aliases
     except Exception as e:
         logger.error(f"Ошибка загрузки алиасов: {e}")
@@ -12,7 +12,7 @@ import logging
 import os
 import sys
 import re
-from datetime import datetime
+from datetime import datetime, timezone
 import requests
 import subprocess  # ← Новый импорт
 
@@ -20,15 +20,26 @@ import subprocess  # ← Новый импорт
 SCHEDULE_FILE = "/opt/mcp-bridge/schedule.json"
 MAJORDOMO_URL = os.getenv("MAJORDOMO_URL", "http://127.0.0.1")  # ← Берётся из .env
 ALIASES_FILE = "/opt/mcp-bridge/device_aliases.json"
-LOG_FILE = "/opt/mcp-bridge/logs/actions.log"
 
 # Настройка логирования
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 logging.basicConfig(level=getattr(logging, LOG_LEVEL), format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger("Scheduler")
 
+# === Импорт единого логгера ===
+# Без него планировщик работает дальше, только не пишет журнал действий
+sys.path.append("/opt/mcp-bridge")
+try:
+    from action_logger import write_record
+except Exception as e:  # не только ImportError: сломанный модуль тоже не должен останавливать задачи
+    logger.error(f"Не удалось импортировать action_logger ({e}). Логирование действий отключено.")
+    write_record = None
+
 # === Вспомогательные функции ===
 
+# Обратный индекс строится один раз на версию файла (mtime, размер, inode): inode меняется при замене файла
+_aliases_cache = {"state": None, "aliases": None}
+
 def load_aliases():
     """
     Загружает алиасы из нового формата:
@@ -45,9 +56,14 @@ def load_aliases():
     Поддерживает дублирующиеся имена в разных категориях.
     Возвращает: {"улица": [spec1], "комната отдыха": [spec_свет, spec_температура]}
     """
-    if not os.path.exists(ALIASES_FILE):
+    try:
+        st = os.stat(ALIASES_FILE)
+    except OSError:
         logger.warning(f"Файл алиасов не найден: {ALIASES_FILE}")
         return {}
+    state = (st.st_mtime_ns, st.st_size, st.st_ino)
+    if _aliases_cache["state"] == state:
+        return _aliases_cache["aliases"]
 
     try:
         with open(ALIASES_FILE, "r", encoding="utf-8") as f:
@@ -57,18 +73,20 @@ def load_aliases():
         for category, details in raw.items():
             if "devices" not in details:
                 continue
+            cat_type = details.get("type", "unknown")
             for key, spec in details["devices"].items():
-                names = [name.strip().lower() for name in key.split(",")]
-                for name in names:
+                # Одна спецификация на ключ, общая для всех его имён
+                entry = {
+                    "object": spec["object"],
+                    "property": spec["property"],
+                    "category": category,
+                    "type": cat_type
+                }
+                for name in key.split(","):
+                    name = name.strip().lower()
                     if name:
-                        if name not in aliases:
-                            aliases[name] = []
-                        aliases[name].append({
-                            "object": spec["object"],
-                            "property": spec["property"],
-                            "category": category,
-                            "type": details.get("type", "unknown")
-                        })
+                        aliases.setdefault(name, []).append(entry)
+        _aliases_cache.update(state=state, aliases=aliases)
         return aliases
     except Exception as e:
         logger.error(f"Ошибка загрузки алиасов: {e}")
@@ -133,11 +151,15 @@ def call_majordomo(method, path, data=None):
         return None
 
 def log_action(action, target, success=True, details=None):
-    """Логирует действия в единый файл."""
+    """
+    Логирует действия в единый файл через action_logger (блокировка и индекс смещений).
+    Уведомления в Telegram планировщик шлёт сам, поэтому log_action из action_logger не используется.
+    """
+    if write_record is None:
+        return
     try:
-        os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
         record = {
-            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
             "source": "scheduler",
             "user": "system",
             "action": action,
@@ -145,8 +167,7 @@ def log_action(action, target, success=True, details=None):
             "success": success,
             "details": details or {}
         }
-        with open(LOG_FILE, "a", encoding="utf-8") as f:
-            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        write_record(record)
     except Exception as e:
         logger.error(f"Ошибка записи лога: {e}")
 
@@ -159,14 +180,13 @@ def send_telegram_error(message):
         return
     
     try:
-        import requests as req
         url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
         payload = {
             "chat_id": TELEGRAM_CHAT_ID,
             "text": f"🚨 Ошибка в планировщике:\n{message}",
             "parse_mode": "HTML"
         }
-        req.post(url, json=payload, timeout=5)
+        requests.post(url, json=payload, timeout=5)
     except Exception as e:
         logger.error(f"Не удалось отправить в Telegram: {e}")
 
@@ -10,10 +10,12 @@ Telegram-бот для управления MajorDoMo через MCP-логик
 """
 
 import os
+import hmac
 import json
 import logging
 import sys
 import re
+import requests
 from telegram import Update
 from telegram.ext import Application, CommandHandler, ContextTypes
 
@@ -24,6 +26,7 @@ from action_logger import log_action
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")  # Получи у @BotFather
 AUTHORIZED_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")  # Твой chat_id
 AUTH_PASSWORD = os.getenv("TELEGRAM_AUTH_PASSWORD", "secret123")
+_AUTH_PASSWORD_B = AUTH_PASSWORD.encode("utf-8")  # байты для сравнения за постоянное время
 MAJORDOMO_URL = os.getenv("MAJORDOMO_URL", "http://127.0.0.1")
 ALIASES_FILE = "/opt/mcp-bridge/device_aliases.json"
 
@@ -33,32 +36,44 @@ AUTHORIZED_USERS = set()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Обратный индекс строится один раз на версию файла (mtime, размер, inode): inode меняется при замене файла
+_aliases_cache = {"state": None, "aliases": None}
+
 def load_aliases():
     """
-    Загружает алиасы и раскрывает составные ключи (через запятую).
+    Загружает алиасы (формат {категория: {"type": ..., "devices": {ключ: spec}}})
+    и раскрывает составные ключи (через запятую).
     Поддерживает дублирующиеся имена в разных категориях.
     Возвращает: {"улица": [spec1], "комната отдыха": [spec_освещение, spec_колонки]}
     """
-    if not os.path.exists(ALIASES_FILE):
+    try:
+        st = os.stat(ALIASES_FILE)
+    except OSError:
         return {}
+    state = (st.st_mtime_ns, st.st_size, st.st_ino)
+    if _aliases_cache["state"] == state:
+        return _aliases_cache["aliases"]
 
     try:
         with open(ALIASES_FILE, "r", encoding="utf-8") as f:
             raw = json.load(f)
 
         aliases = {}
-        for category, devices in raw.items():
-            for key, spec in devices.items():
-                names = [name.strip().lower() for name in key.split(",")]
-                for name in names:
+        for category, details in raw.items():
+            if "devices" not in details:
+                continue
+            for key, spec in details["devices"].items():
+                # Одна спецификация на ключ, общая для всех его имён
+                entry = {
+                    "object": spec["object"],
+                    "property": spec["property"],
+                    "category": category
+                }
+                for name in key.split(","):
+                    name = name.strip().lower()
                     if name:
-                        if name not in aliases:
-                            aliases[name] = []
-                        aliases[name].append({
-                            "object": spec["object"],
-                            "property": spec["property"],
-                            "category": category
-                        })
+                        aliases.setdefault(name, []).append(entry)
+        _aliases_cache.update(state=state, aliases=aliases)
         return aliases
     except Exception as e:
         logger.error(f"Ошибка загрузки алиасов: {e}")
@@ -96,7 +111,6 @@ def find_device_by_category(alias_name: str, preferred_categories: list = None):
     return specs[0] if specs else None
 
 def call_majordomo(method, path, data=None, params=None):
-    import requests
     url = f"{MAJORDOMO_URL}/api/{path}"
     try:
         if method == "POST":
@@ -113,7 +127,7 @@ async def auth(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("Использование: /auth <пароль>")
         return
     password = context.args[0]
-    if password == AUTH_PASSWORD:
+    if hmac.compare_digest(password.encode("utf-8"), _AUTH_PASSWORD_B):
         AUTHORIZED_USERS.add(update.effective_chat.id)
         await update.message.reply_text("✅ Авторизация успешна!")
     else:
@@ -136,10 +150,10 @@ async def light(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     if not dev:
         aliases = load_aliases()
+        # Каждое имя попадает в список один раз, даже при нескольких спецификациях
         available = ", ".join(
-            k for k, specs in aliases.items() 
-            for spec in specs 
-            if spec["category"] == "освещение"
+            k for k, specs in aliases.items()
+            if any(spec["category"] == "освещение" for spec in specs)
         )
         await update.message.reply_text(f"Не найдено. Доступные: {available}")
         return
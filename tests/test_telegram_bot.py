@@ -0,0 +1,40 @@
+"""Разбор device_aliases.json в Telegram-боте."""
+
+import os
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+pytest.importorskip("telegram")
+pytest.importorskip("requests")
+import telegram_bot  # noqa: E402
+
+
+@pytest.fixture
+def aliases(monkeypatch):
+    """Индекс имён, построенный по настоящему device_aliases.json из репозитория."""
+    monkeypatch.setattr(telegram_bot, "ALIASES_FILE", os.path.join(REPO_DIR, "device_aliases.json"))
+    monkeypatch.setitem(telegram_bot._aliases_cache, "state", None)
+    return telegram_bot.load_aliases()
+
+
+def test_devices_come_from_devices_section(aliases):
+    # Раньше бот перебирал поля категории как устройства, падал на строке "type"
+    # и возвращал пустой индекс
+    assert aliases
+    assert "type" not in aliases and "devices" not in aliases
+    assert aliases["улица"] == [{"object": "Relay01", "property": "status", "category": "свет"}]
+
+
+def test_composite_keys_are_split(aliases):
+    assert aliases["баня"] == aliases["парилка"]
+    assert aliases["баня"][0]["object"] == "Relay06"
+    assert aliases["прихожая"] == aliases["коридор"]
+
+
+def test_duplicate_names_keep_every_category(aliases):
+    assert [spec["category"] for spec in aliases["гостиная"]] == ["свет", "колонки"]
+    assert telegram_bot.find_device_by_category("гостиная", ["колонки"])["category"] == "колонки"
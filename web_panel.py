@@ -15,49 +15,218 @@
 """
 import os
 import sys
+import re
 import json
+import hmac
+import base64
+import hashlib
+import shutil
+import copy
+import struct
+import fcntl
+import threading
+import time
+import zipfile
 import subprocess
-from flask import Flask, request, jsonify, render_template_string, Response
+import urllib.request
+from datetime import datetime, timezone
+from contextlib import contextmanager
+from functools import wraps, lru_cache
+from flask import Flask, request, jsonify, Response, make_response, send_file
+from flask.json.provider import DefaultJSONProvider
+from jinja2 import Environment, DictLoader, FileSystemBytecodeCache
+from markupsafe import Markup
+
+# orjson заметно быстрее stdlib json; если не установлен — работаем на json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Сжатие ответов (br/gzip) — необязательная зависимость
+try:
+    from flask_compress import Compress
+except ImportError:
+    Compress = None
+
+# Потоковый разбор импортируемого файла алиасов — необязательная зависимость
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Минификация CSS/JS при импорте — необязательные зависимости
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+# === Импорт единого логгера ===
+sys.path.append("/opt/mcp-bridge")
+try:
+    from action_logger import log_action as _external_log
+except ImportError:
+    _external_log = None
 
 # === Настройки безопасности ===
 WEB_PANEL_USER = os.getenv("WEB_PANEL_USER", "admin")
 WEB_PANEL_PASS = os.getenv("WEB_PANEL_PASS", "0")
+# Байтовые копии для сравнения за постоянное время
+_USER_B = WEB_PANEL_USER.encode("utf-8")
+_PASS_B = WEB_PANEL_PASS.encode("utf-8")
 
 ALIASES_FILE = "/opt/mcp-bridge/device_aliases.json"
+ALIASES_LOCK_FILE = ALIASES_FILE + ".lock"  # flock для правок алиасов между воркерами
 LOG_FILE = "/opt/mcp-bridge/logs/actions.log"
+LOG_INDEX_FILE = LOG_FILE + ".idx"  # смещения записей лога, ведёт action_logger
 VERSION_FILE = "/opt/mcp-bridge/VERSION"
 STATUS_FILE = "/opt/mcp-bridge/update_status.json"
+JINJA_CACHE_DIR = "/opt/mcp-bridge/cache/jinja"
+EXPORT_CHUNK_ROWS = 500  # строк CSV в одной порции потоковой выгрузки
+LOG_TAIL_CHUNK = 64 * 1024  # байт, читаемых за раз с конца файла логов
+LOGS_SEARCH_PAGES_AHEAD = 10  # при поиске total считается не дальше этого числа страниц вперёд
+LOGS_MAX_PAGE_SIZE = 1000  # наибольшая страница /logs/api, как в списке на странице логов
+LOGS_CACHE_ROWS = 5000  # сколько найденных записей держит кэш поиска в одном воркере
+LOGS_STREAM_POLL = 1.0  # с, как часто /logs/stream проверяет размер файла логов
+LOGS_STREAM_PING = 15.0  # с тишины до пинга: прокси не закрывают поток, обрыв клиента замечается
+UPDATE_IO_BUFFER = 1 << 20  # буфер скачивания и распаковки архива обновления
 GITHUB_REPO = "golnet1/mcp-majordomo-xiaozhi"
 
+class OrjsonProvider(DefaultJSONProvider):
+    """jsonify и request.get_json через orjson. Ответ сразу собирается в байты, без промежуточной str."""
+    def dump_bytes(self, obj, sort_keys=None, newline=False):
+        option = orjson.OPT_NON_STR_KEYS
+        # Как и json.dumps у Flask, по умолчанию сортируем ключи (sort_keys приложения)
+        if self.sort_keys if sort_keys is None else sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if newline:
+            option |= orjson.OPT_APPEND_NEWLINE
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        return self.dump_bytes(obj, kwargs.get("sort_keys")).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Те же правила аргументов, что у jsonify: одно значение, список значений или словарь kwargs
+        if args and kwargs:
+            raise TypeError("app.json.response() takes either args or kwargs, not both")
+        if not args and not kwargs:
+            obj = None
+        elif len(args) == 1:
+            obj = args[0]
+        else:
+            obj = list(args) or kwargs
+        return self._app.response_class(self.dump_bytes(obj, newline=True), mimetype=self.mimetype)
+
 # === Инициализация Flask ===
 app = Flask(__name__)
+if orjson is not None:
+    app.json = OrjsonProvider(app)
+
+def jsonify_ordered(data):
+    """jsonify без сортировки ключей: категории и устройства идут в порядке файла алиасов."""
+    if orjson is not None:
+        body = app.json.dump_bytes(data, sort_keys=False, newline=True)
+    else:
+        body = app.json.dumps(data, sort_keys=False, separators=(",", ":")) + "\n"
+    return app.response_class(body, mimetype=app.json.mimetype)
+
+app.config["COMPRESS_MIMETYPES"] = ["text/html", "text/css", "application/javascript", "application/json", "text/csv"]
+app.config["COMPRESS_ALGORITHM"] = ["br", "gzip"]
+if Compress is not None:
+    Compress(app)
 
 # === Отключаем кэширование в браузере ===
+_NO_CACHE_HEADERS = (
+    ("Cache-Control", "no-cache, no-store, must-revalidate"),
+    ("Pragma", "no-cache"),
+    ("Expires", "0"),
+)
+
 @app.after_request
 def after_request(response):
-    response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-    response.headers["Pragma"] = "no-cache"
-    response.headers["Expires"] = "0"
+    # Маршрут сам задал политику кэширования (например, статические ресурсы)
+    if "Cache-Control" in response.headers:
+        return response
+    # Заголовков Cache-Control ещё нет, поэтому просто дописываем готовый набор
+    response.headers.extend(_NO_CACHE_HEADERS)
     return response
 
 # === Вспомогательные функции ===
 def check_auth(username, password):
-    return username == WEB_PANEL_USER and password == WEB_PANEL_PASS
+    # Сравниваем обе части без раннего выхода, чтобы не выдавать по времени, какая неверна
+    user_ok = hmac.compare_digest((username or "").encode("utf-8"), _USER_B)
+    pass_ok = hmac.compare_digest((password or "").encode("utf-8"), _PASS_B)
+    return user_ok and pass_ok
 
 def authenticate():
     return Response('Требуется авторизация', 401,
                     {'WWW-Authenticate': 'Basic realm="Login Required"'})
 
+@lru_cache(maxsize=128)
+def _auth_ok(header):
+    """
+    Проверяет заголовок Authorization (Basic). Результат кэшируется по строке
+    заголовка: браузер шлёт его с каждым запросом без изменений.
+    Учётные данные берутся из окружения, поэтому кэш живёт до перезапуска.
+    """
+    scheme, _, token = header.partition(" ")
+    if scheme.lower() != "basic":
+        return False
+    try:
+        decoded = base64.b64decode(token.strip()).decode("utf-8")
+    except (ValueError, UnicodeDecodeError):
+        return False
+    username, sep, password = decoded.partition(":")
+    if not sep:
+        return False
+    return check_auth(username, password)
+
 def requires_auth(f):
-    from functools import wraps
     @wraps(f)
     def decorated(*args, **kwargs):
-        auth = request.authorization
-        if not auth or not check_auth(auth.username, auth.password):
+        if not _auth_ok(request.headers.get("Authorization", "")):
             return authenticate()
         return f(*args, **kwargs)
     return decorated
 
+# === JSON (orjson при наличии) ===
+def json_loads(data):
+    """Разбирает JSON из str или bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def json_dumps_pretty(data):
+    """Сериализует в UTF-8 байты с отступом в 2 пробела."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+
+def file_state(path):
+    """Время изменения, размер и inode файла — меняются при любой записи или замене; None, если файла нет.
+
+    Без inode файл той же длины, подменённый через os.replace в пределах грубого mtime ФС, выглядел бы прежним.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+# Последняя прочитанная или записанная версия алиасов и состояние файла (mtime, размер, inode).
+# Кэш только для чтения: обработчики правок берут копию (load_aliases_copy), а в кэш
+# попадает лишь то, что save_aliases действительно записал.
+_aliases_cache = {"state": None, "raw": None}
+_aliases_lock = threading.Lock()
+
 # === Загрузка алиасов (оригинальная структура) ===
 def load_aliases():
     """
@@ -73,67 +242,357 @@ def load_aliases():
       ...
     }
     """
-    if not os.path.exists(ALIASES_FILE):
+    state = file_state(ALIASES_FILE)
+    if state is None:
         return {}
+    # Файл перечитывается, только если его изменили (в том числе другие сервисы)
+    if _aliases_cache["state"] == state:
+        return _aliases_cache["raw"]
     try:
-        with open(ALIASES_FILE, "r", encoding="utf-8") as f:
-            raw = json.load(f)
+        with open(ALIASES_FILE, "rb") as f:
+            raw = json_loads(f.read())
+        _aliases_cache.update(state=state, raw=raw)
         return raw
     except Exception as e:
         print(f"Ошибка загрузки алиасов: {e}", file=sys.stderr)
         return {}
 
+def load_aliases_copy():
+    """Изменяемая копия алиасов: правка, не дошедшая до save_aliases, не портит кэш."""
+    return copy.deepcopy(load_aliases())
+
+def aliases_write_lock(f):
+    """
+    Обработчик правки алиасов целиком выполняется под блокировкой, иначе два
+    параллельных read-modify-write теряют одно из изменений.
+    threading.Lock разделяет потоки (гринлеты) воркера, flock — воркеры gunicorn между собой.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        with _aliases_lock, open(ALIASES_LOCK_FILE, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)  # снимается при закрытии файла
+            return f(*args, **kwargs)
+    return decorated
+
 # === Сохранение алиасов (оригинальная структура) ===
 def save_aliases(data):
     """
     Сохраняет оригинальную структуру в файл.
+    Пишет во временный файл и атомарно подменяет оригинал через os.replace,
+    чтобы другие сервисы никогда не видели пустой или недописанный файл.
     """
     backup = ALIASES_FILE + ".bak"
-    if os.path.exists(ALIASES_FILE):
-        os.replace(ALIASES_FILE, backup)
+    tmp = ALIASES_FILE + ".tmp"
 
     try:
-        with open(ALIASES_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        # Храним одну резервную копию предыдущей версии. Жёсткая ссылка вместо копии:
+        # os.replace ниже подменит только имя основного файла, старое содержимое
+        # останется доступным через .bak без перезаписи байтов
+        if os.path.exists(ALIASES_FILE):
+            if os.path.exists(backup):
+                os.remove(backup)
+            os.link(ALIASES_FILE, backup)
+
+        with open(tmp, "wb") as f:
+            f.write(json_dumps_pretty(data))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, ALIASES_FILE)
+        # Записанное уже в памяти — повторно разбирать файл не нужно
+        _aliases_cache.update(state=file_state(ALIASES_FILE), raw=data)
         return True
     except Exception as e:
         print(f"Ошибка сохранения алиасов: {e}", file=sys.stderr)
-        # Восстановить из бекапа в случае ошибки
-        if os.path.exists(backup):
-            os.replace(backup, ALIASES_FILE)
+        # Оригинал не тронут — достаточно убрать временный файл
+        if os.path.exists(tmp):
+            os.remove(tmp)
         return False
 
 
 def log_action(source, action, target, success=True, user="web", details=None):
-    try:
-        from action_logger import log_action as logger
-        logger(source=source, user=user, action=action, target=target, success=success, details=details)
-    except ImportError:
+    if _external_log is not None:
+        _external_log(source=source, user=user, action=action, target=target, success=success, details=details)
+    else:
         print(f"Log: {source} - {user} - {action} - {target} - {success} - {details}", file=sys.stderr)
 
-def load_logs(limit=100, query=""):
-    if not os.path.exists(LOG_FILE):
+def iter_lines_reversed(f, end=None, chunk=LOG_TAIL_CHUNK):
+    """Строки файла от последней к первой (или от позиции end к началу); файл читается блоками с конца."""
+    if end is None:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+    pos = end
+    rest = b""
+    while pos > 0:
+        step = min(chunk, pos)
+        pos -= step
+        f.seek(pos)
+        lines = (f.read(step) + rest).split(b"\n")
+        # Первая часть блока может быть обрывком строки — дочитаем её со следующим блоком
+        rest = lines[0]
+        for line in reversed(lines[1:]):
+            if line.strip():
+                yield line
+    if rest.strip():
+        yield rest
+
+def load_logs(limit=100, query="", state=None, with_lines=False):
+    """
+    Последние limit записей с query; state — уже снятое file_state(LOG_FILE), если есть.
+    with_lines — пары (сырая строка лога, запись) вместо записей.
+    """
+    if state is None:
+        state = file_state(LOG_FILE)
+    if state is None:
         return []
     try:
-        logs = []
-        with open(LOG_FILE, "r", encoding="utf-8") as f:
-            for line in f:
-                try:
-                    entry = json.loads(line.strip())
-                    if query.lower() in json.dumps(entry, ensure_ascii=False).lower():
-                        logs.append(entry)
-                except json.JSONDecodeError:
-                    continue
-
-        # Сортируем по timestamp от новых к старым (предполагаем ISO 8601 формат)
-        # и возвращаем только нужное количество (limit) с начала списка (самые новые)
-        logs.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-        return logs[:limit]
-
+        found = _load_logs_cached(state, query.lower(), limit)
+        return list(found) if with_lines else [entry for _, entry in found]
     except Exception as e:
         print(f"Ошибка чтения логов: {e}", file=sys.stderr)
         return []
 
+@lru_cache(maxsize=128)
+def query_pattern(query):
+    """
+    Регулярное выражение для поиска подстроки без учёта регистра; компилируется один раз на запрос.
+    Для ASCII-запроса шаблон байтовый: байты ASCII в UTF-8 не встречаются внутри многобайтовых
+    символов, поэтому искать можно прямо в сырой строке, не декодируя её.
+    """
+    if query.isascii():
+        return re.compile(re.escape(query.encode("ascii")), re.IGNORECASE)
+    return re.compile(re.escape(query), re.IGNORECASE)
+
+# Результаты поиска только для текущей версии файла логов: после любой записи прежние
+# больше не запрашиваются, поэтому сбрасываются целиком, а не доживают в кэше.
+# Объём ограничен числом записей на все запросы вместе; больше LOGS_CACHE_ROWS не кэшируется
+_logs_cache = {"state": None, "results": {}}
+_logs_cache_lock = threading.Lock()
+
+def _load_logs_cached(state, query, limit):
+    key = (query, limit)
+    with _logs_cache_lock:
+        if _logs_cache["state"] != state:
+            _logs_cache.update(state=state, results={})
+        found = _logs_cache["results"].get(key)
+    if found is not None:
+        return found
+
+    # Лог только дописывается, поэтому с конца файла записи идут от новых к старым:
+    # читаем хвост и останавливаемся, набрав limit подходящих записей
+    with open(LOG_FILE, "rb") as f:
+        # Читается ровно та версия файла, по которой закэширован результат: дописанное позже
+        # в выдачу не попадает, и размер из state точно отмечает, до какого места прочитан лог
+        end = min(state[1], os.fstat(f.fileno()).st_size)
+        found = tuple(matching_entries(iter_lines_reversed(f, end), query, limit, with_lines=True))
+
+    with _logs_cache_lock:
+        results = _logs_cache["results"]
+        if _logs_cache["state"] == state and len(found) <= LOGS_CACHE_ROWS:
+            # Вытесняем самые старые запросы (dict хранит порядок вставки), пока новый не поместится
+            while results and sum(map(len, results.values())) + len(found) > LOGS_CACHE_ROWS:
+                del results[next(iter(results))]
+            results[key] = found
+    return found
+
+def matching_entries(lines, query, limit, with_lines=False):
+    """
+    Первые limit записей из строк лога, содержащих query (уже в нижнем регистре).
+    with_lines — отдавать пары (сырая строка, запись).
+    """
+    pattern = query_pattern(query) if query else None
+    search = pattern.search if pattern else None
+    # IGNORECASE для байтов учитывает только ASCII — не-ASCII запрос ищем в декодированном тексте
+    decode = pattern is not None and isinstance(pattern.pattern, str)
+    count = 0
+    for line in lines:
+        # action_logger пишет строку JSON без экранирования юникода, поэтому значения полей
+        # видны в сырой строке как есть; JSON разбираем только у совпавших строк
+        if search and not search(line.decode("utf-8", "replace") if decode else line):
+            continue
+        try:
+            entry = json_loads(line)
+        except json.JSONDecodeError:
+            continue
+        yield (line, entry) if with_lines else entry
+        count += 1
+        if count >= limit:
+            return
+
+# Элемент индекса лога: смещение начала записи, 8 байт little-endian
+_OFFSET = struct.Struct("<Q")
+
+def _read_offsets(idx, first, last):
+    """Смещения записей с номерами first..last-1 из открытого файла индекса."""
+    idx.seek(first * _OFFSET.size)
+    data = idx.read((last - first) * _OFFSET.size)
+    return [item[0] for item in _OFFSET.iter_unpack(data)]
+
+def _blank_prefix(log, end):
+    """До смещения end в логе только пустые строки — так начинается файл, если первая запись не с нуля."""
+    log.seek(0)
+    pos = 0
+    chunk = b""
+    while pos < end:
+        chunk = log.read(min(LOG_TAIL_CHUNK, end - pos))
+        if not chunk or chunk.strip():
+            return False
+        pos += len(chunk)
+    return end == 0 or chunk.endswith(b"\n")
+
+def _log_index_valid(log, log_size):
+    """
+    Индекс согласован с логом: первая запись идёт сразу после пустых строк в начале файла
+    (как их пропускает перестройка), последняя доходит ровно до конца файла.
+    Проверяется только хвост, поэтому все писатели лога обязаны дописывать индекс
+    (action_logger.write_record) — запись в обход индекса посреди файла здесь не видна.
+    """
+    try:
+        idx_size = os.path.getsize(LOG_INDEX_FILE)
+    except OSError:
+        return False
+    if idx_size % _OFFSET.size:
+        return False
+    if idx_size == 0:
+        return _blank_prefix(log, log_size)
+    with open(LOG_INDEX_FILE, "rb") as idx:
+        first = _read_offsets(idx, 0, 1)[0]
+        last = _read_offsets(idx, idx_size // _OFFSET.size - 1, idx_size // _OFFSET.size)[0]
+    if last >= log_size or not _blank_prefix(log, first):
+        return False
+    log.seek(max(last - 1, 0))
+    tail = log.read(log_size - max(last - 1, 0))
+    if last and not tail.startswith(b"\n"):
+        return False
+    # После последней проиндексированной записи не должно быть других строк
+    return b"\n" not in tail[1 if last else 0:].rstrip(b"\n")
+
+def _rebuild_log_index(log):
+    """Один проход по логу: записывает смещения всех непустых строк во временный файл и подменяет индекс."""
+    log.seek(0)
+    offsets = bytearray()
+    pos = 0
+    for line in log:
+        if line.strip():
+            offsets += _OFFSET.pack(pos)
+        pos += len(line)
+    tmp = LOG_INDEX_FILE + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(offsets)
+    os.replace(tmp, LOG_INDEX_FILE)
+
+@contextmanager
+def open_indexed_log():
+    """
+    Открывает лог и его индекс под разделяемой блокировкой, при необходимости перестроив индекс.
+    Отдаёт (лог, размер лога, индекс, число записей).
+    """
+    while True:
+        log = open(LOG_FILE, "rb")
+        # Писатели держат LOCK_EX на время записи строки и её смещения, log_rotator — на всю ротацию
+        fcntl.flock(log, fcntl.LOCK_SH)
+        if os.fstat(log.fileno()).st_nlink:
+            break
+        # Пока ждали, ротация подменила лог — старый файл без имени, открываем новый
+        log.close()
+    with log:
+        log_size = os.fstat(log.fileno()).st_size
+        if not _log_index_valid(log, log_size):
+            fcntl.flock(log, fcntl.LOCK_EX)
+            log_size = os.fstat(log.fileno()).st_size
+            if not _log_index_valid(log, log_size):
+                _rebuild_log_index(log)
+        with open(LOG_INDEX_FILE, "rb") as idx:
+            total = os.fstat(idx.fileno()).st_size // _OFFSET.size
+            yield log, log_size, idx, total
+
+def _record_timestamp(log, offset):
+    log.seek(offset)
+    try:
+        return json_loads(log.readline()).get("timestamp", "")
+    except (json.JSONDecodeError, AttributeError):
+        return ""
+
+def read_logs_before(before_ts, count, query=""):
+    """
+    Курсорная выборка: до count записей старше before_ts (ISO 8601), от новых к старым.
+    Начало находится двоичным поиском по индексу, дальше читается только хвост перед ним.
+    Возвращает список или None, если индекс недоступен.
+    """
+    if not os.path.exists(LOG_FILE):
+        return []
+    try:
+        with open_indexed_log() as (log, log_size, idx, total):
+            # Первая запись с timestamp >= before_ts; всё, что до неё, — старше курсора
+            lo, hi = 0, total
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if _record_timestamp(log, _read_offsets(idx, mid, mid + 1)[0]) < before_ts:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            end = _read_offsets(idx, lo, lo + 1)[0] if lo < total else log_size
+            return list(matching_entries(iter_lines_reversed(log, end), query.lower(), count))
+    except OSError as e:
+        print(f"Индекс логов недоступен: {e}", file=sys.stderr)
+        return None
+
+def read_log_page(start, count):
+    """
+    Страница лога по индексу смещений: записи start..start+count-1, считая от самой новой.
+    Читаются только нужные строки. Возвращает (записи, всего записей, размер лога на момент чтения)
+    или None, если индекс недоступен.
+    """
+    if not os.path.exists(LOG_FILE):
+        return [], 0, 0
+    try:
+        with open_indexed_log() as (log, log_size, idx, total):
+            # Записи в логе идут от старых к новым: переводим номер страницы в диапазон строк
+            hi = total - start
+            lo = max(hi - count, 0)
+            if hi <= 0:
+                return [], total, log_size
+            bounds = _read_offsets(idx, lo, min(hi + 1, total))
+            if hi == total:
+                bounds.append(log_size)
+            base = bounds[0]
+            log.seek(base)
+            data = log.read(bounds[-1] - base)
+    except OSError as e:
+        print(f"Индекс логов недоступен: {e}", file=sys.stderr)
+        return None
+
+    logs = []
+    for begin, end in zip(bounds, bounds[1:]):
+        try:
+            logs.append(json_loads(data[begin - base:end - base]))
+        except json.JSONDecodeError:
+            continue
+    logs.reverse()
+    return logs, total, log_size
+
+def timestamp_ms(value):
+    """ISO 8601 (UTC, с суффиксом Z) -> миллисекунды с начала эпохи; None, если не разобрать."""
+    try:
+        dt = datetime.fromisoformat(value.rstrip("Z"))
+    except (AttributeError, ValueError):
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+def compact_log(entry):
+    """Запись лога для /logs/api: короткие ключи и время числом."""
+    return {
+        "ts": timestamp_ms(entry.get("timestamp", "")),
+        "src": entry.get("source", ""),
+        "u": entry.get("user", ""),
+        "a": entry.get("action", ""),
+        "t": entry.get("target", ""),
+        "ok": entry.get("success", False),
+        # null, а не {}: клиент строит строку деталей только для непустых
+        "d": entry.get("details") or None,
+    }
+
 # === Функции обновления ===
 def get_current_version():
     if os.path.exists(VERSION_FILE):
@@ -143,7 +602,6 @@ def get_current_version():
 
 def get_latest_version():
     try:
-        import urllib.request
         url = f"https://api.github.com/repos/{GITHUB_REPO}/releases/latest"
         with urllib.request.urlopen(url, timeout=10) as resp:
             data = json.loads(resp.read().decode())
@@ -152,24 +610,35 @@ def get_latest_version():
         print(f"Ошибка получения версии: {e}", file=sys.stderr)
         return None
 
+FICLONE = 0x40049409  # ioctl reflink-копирования (btrfs, xfs)
+
+def copy_update_file(src, dst):
+    """
+    Копирует файл обновления с правами и временем изменения, как shutil.copy2.
+    Сначала пробует reflink (FICLONE): на btrfs/xfs это только метаданные.
+    Иначе — shutil.copyfile, который на Linux копирует через sendfile в ядре.
+    """
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            cloned = True
+        except OSError:
+            # Другая ФС или нет поддержки reflink (например, /tmp в tmpfs)
+            cloned = False
+    if not cloned:
+        shutil.copyfile(src, dst)
+    shutil.copystat(src, dst)
+
 def update_from_github():
     try:
-        import urllib.request
-        import zipfile
-        import shutil
         # Получаем URL архива
         url = f"https://api.github.com/repos/{GITHUB_REPO}/zipball/main"
         # Скачиваем
         zip_path = "/tmp/mcp_update.zip"
-        urllib.request.urlretrieve(url, zip_path)
-
-        # Распаковываем
-        extract_dir = "/tmp/mcp_update/"
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(extract_dir)
-
-        # Находим папку с содержимым (обычно первая папка в архиве)
-        extracted_folder = os.path.join(extract_dir, os.listdir(extract_dir)[0])
+        # Крупный буфер вместо 8 КиБ у urlretrieve: меньше системных вызовов на чтение и запись
+        with urllib.request.urlopen(url, timeout=30) as resp, \
+                open(zip_path, "wb", buffering=UPDATE_IO_BUFFER) as out:
+            shutil.copyfileobj(resp, out, length=UPDATE_IO_BUFFER)
 
         # Определяем файлы, которые нужно обновить
         files_to_update = [
@@ -185,15 +654,32 @@ def update_from_github():
             "VERSION"
         ]
 
+        # Распаковываем только обновляемые файлы, а не весь репозиторий
+        extract_dir = "/tmp/mcp_update/"
+        with open(zip_path, "rb", buffering=UPDATE_IO_BUFFER) as zip_file, \
+                zipfile.ZipFile(zip_file, 'r') as zip_ref:
+            names = zip_ref.namelist()
+            # Всё содержимое архива GitHub лежит в одной корневой папке вида owner-repo-sha/
+            root = names[0].split("/", 1)[0]
+            wanted = {f"{root}/{file}" for file in files_to_update}
+            for member in names:
+                if member in wanted:
+                    zip_ref.extract(member, extract_dir)
+        extracted_folder = os.path.join(extract_dir, root)
+
+        # Копируем по очереди: под воркерами gevent потоки пула — те же гринлеты,
+        # и блокирующее копирование в них всё равно шло бы последовательно, занимая весь воркер
         updated_any = False
         for file in files_to_update:
             src_file = os.path.join(extracted_folder, file)
-            dst_file = f"/opt/mcp-bridge/{file}"
             if os.path.exists(src_file):
-                shutil.copy2(src_file, dst_file)
+                copy_update_file(src_file, f"/opt/mcp-bridge/{file}")
                 print(f"Обновлён файл: {file}", file=sys.stderr)
                 updated_any = True
 
+        # Сбрасываем данные на диск до перезапуска сервисов
+        os.sync()
+
         try:
             # Удаляем файл, если он существует
             if os.path.isfile(zip_path):
@@ -222,241 +708,1085 @@ def update_from_github():
         print(f"Ошибка обновления: {e}", file=sys.stderr)
         return False
 
+# === Статические ресурсы (CSS/JS) ===
+# Не содержат переменных Jinja, поэтому отдаются отдельно и кэшируются браузером
+
+# Общие для обеих страниц палитра, разметка шапки и переключатель темы
+THEME_CSS = """:root {
+    --bg: #ffffff;
+    --text: #333333;
+    --card-bg: #ffffff;
+    --border: #e0e0e0;
+    --input-bg: #f5f5f5;
+    --success: #28a745;
+    --warning: #ffc107;
+    --danger: #dc3545;
+    --primary: #007bff;
+}
+[data-theme="dark"] {
+    --bg: #121212;
+    --text: #e0e0e0;
+    --card-bg: #1e1e1e;
+    --border: #333333;
+    --input-bg: #2c2c2c;
+}
+body {
+    font-family: Arial, sans-serif;
+    background-color: var(--bg);
+    color: var(--text);
+    margin: 0;
+    padding: 16px;
+}
+/* Плавная смена цветов только при переключении темы, не при загрузке */
+body.theme-transitioning {
+    transition: background-color 0.3s, color 0.3s;
+}
+.container {
+    max-width: 1200px;
+    margin: 0 auto;
+}
+header {
+    display: flex;
+    justify-content: space-between;
+    align-items: center;
+    margin-bottom: 16px;
+}
+h1 {
+    margin: 0;
+}
+#theme-toggle {
+    background: none;
+    border: 1px solid var(--border);
+    color: var(--text);
+    padding: 4px 8px;
+    cursor: pointer;
+    border-radius: 4px;
+}"""
+
+THEME_JS = r"""function toggleTheme() {
+    const currentTheme = document.documentElement.getAttribute('data-theme');
+    const newTheme = currentTheme === 'dark' ? 'light' : 'dark';
+    document.body.classList.add('theme-transitioning');
+    setTimeout(() => document.body.classList.remove('theme-transitioning'), 350);
+    document.documentElement.setAttribute('data-theme', newTheme);
+    document.cookie = `theme=${newTheme}; path=/; max-age=31536000`; // 1 year
+}
+// Тему из cookie выставляет сервер в <html data-theme>, читать cookie при загрузке не нужно"""
+
+INDEX_CSS = """#update-notification {
+    background: var(--warning);
+    color: #000;
+    padding: 8px;
+    border-radius: 4px;
+    margin-bottom: 16px;
+    display: none;
+    text-align: center;
+}
+.category {
+    background: var(--card-bg);
+    border: 1px solid var(--border);
+    border-radius: 8px;
+    padding: 16px;
+    margin-bottom: 16px;
+}
+.category-header {
+    display: flex;
+    justify-content: space-between;
+    align-items: center;
+    margin-bottom: 16px;
+}
+.add-device {
+    background: var(--input-bg);
+    padding: 16px;
+    border-radius: 8px;
+    margin-bottom: 16px;
+}
+.add-category {
+    background: var(--input-bg);
+    padding: 16px;
+    border-radius: 8px;
+    margin-bottom: 16px;
+    display: flex;
+    flex-direction: column;
+    gap: 8px;
+}
+@media (min-width: 600px) {
+    .add-category {
+        flex-direction: row;
+        gap: 8px;
+    }
+}
+.add-category input, .add-category select {
+    padding: 8px;
+    border: 1px solid var(--border);
+    border-radius: 4px;
+    background: var(--input-bg);
+    color: var(--text);
+}
+.add-category-btn {
+    background: var(--success);
+    color: white;
+    border: none;
+    padding: 8px 16px;
+    border-radius: 4px;
+    cursor: pointer;
+    font-size: 1rem;
+}
+.device-fields {
+    display: flex;
+    flex-direction: column;
+    gap: 8px;
+}
+.device-fields input {
+    padding: 8px;
+    border: 1px solid var(--border);
+    border-radius: 4px;
+    background: var(--input-bg);
+    color: var(--text);
+}
+.add-device-btn {
+    background: var(--success);
+    color: white;
+    border: none;
+    padding: 10px;
+    border-radius: 4px;
+    cursor: pointer;
+    font-size: 1rem;
+    width: 100%;
+    margin-top: 8px;
+}
+.device {
+    padding: 16px;
+    border-bottom: 1px solid var(--border);
+}
+.device:last-child {
+    border-bottom: none;
+}
+.device-header {
+    display: flex;
+    justify-content: space-between;
+    align-items: center;
+    margin-bottom: 8px;
+}
+.device-name {
+    font-weight: bold;
+    font-size: 1.1rem;
+}
+.device-actions button {
+    margin-left: 6px;
+    padding: 4px 8px;
+    border: none;
+    border-radius: 4px;
+    cursor: pointer;
+    font-size: 12px;
+}
+.edit-btn { background: var(--warning); color: #000; }
+.delete-btn { background: var(--danger); color: white; }
+.device-details {
+    font-size: 0.9rem;
+    color: #888;
+}
+@media (min-width: 600px) {
+    .device-fields {
+        flex-direction: row;
+        gap: 8px;
+    }
+    .device-fields input {
+        flex: 1;
+    }
+}
+.export-import {
+    text-align: center;
+    margin: 16px 0;
+}
+.export-import button {
+    margin: 0 8px;
+    padding: 8px 16px;
+    border: none;
+    border-radius: 4px;
+    cursor: pointer;
+    font-size: 1rem;
+}
+.export-btn { background: var(--success); color: white; }
+.import-btn { background: var(--primary); color: white; }
+/* Уведомление об обновлении */
+#update-notification.show {
+    display: block;
+}
+.modal {
+    display: none;
+    position: fixed;
+    z-index: 1000;
+    left: 0;
+    top: 0;
+    width: 100%;
+    height: 100%;
+    background-color: rgba(0,0,0,0.4);
+}
+.modal-content {
+    background-color: var(--card-bg);
+    margin: 15% auto;
+    padding: 20px;
+    border: 1px solid var(--border);
+    border-radius: 8px;
+    width: 80%;
+    max-width: 500px;
+}
+.modal-header {
+    margin-bottom: 16px;
+}
+.modal-actions {
+    margin-top: 16px;
+    text-align: right;
+}
+.modal-actions button {
+    padding: 6px 12px;
+    margin-left: 8px;
+    border: none;
+    border-radius: 4px;
+    cursor: pointer;
+}
+.save-btn { background: var(--success); color: white; }
+.cancel-btn { background: var(--danger); color: white; margin-left: 8px; }
+.modal-content input { width: 100%; margin-bottom: 8px; }
+#update-notification button { margin-left: 10px; }
+#import-file { display: none; }
+.message {
+    padding: 8px;
+    margin: 8px 0;
+    border-radius: 4px;
+    background: #d4edda;
+    color: #155724;
+}
+.message-error {
+    background: #f8d7da;
+    color: #721c24;
+}"""
+
+INDEX_JS = r"""let currentEdit = { category: '', name: '' };
+
+function showMessage(msg, isError = false) {
+    // Текст ошибки может содержать пользовательский ввод — вставляем его как текст, не как HTML
+    const box = document.createElement('div');
+    box.className = isError ? 'message message-error' : 'message';
+    box.textContent = msg;
+    document.getElementById('status').replaceChildren(box);
+}
+
+// === Общий вызов API: запрос, сообщение, сброс кэша алиасов ===
+const JSON_H = { 'Content-Type': 'application/json' };
+
+// Возвращает тело ответа при успехе и null при ошибке
+async function apiCall(url, opts, successMsg, errorMsg = 'Ошибка') {
+    const res = await fetch(url, opts);
+    const data = await res.json().catch(() => ({}));
+    if (!res.ok) {
+        showMessage(data.error || errorMsg, true);
+        return null;
+    }
+    showMessage(successMsg);
+    dropAliasesCache();
+    return data;
+}
+
+// === Отрисовка алиасов на клиенте (клонирование <template>) ===
+function findCategory(name) {
+    return Array.from(document.querySelectorAll('.category')).find(el => el.dataset.category === name);
+}
+
+function findDevice(categoryEl, name) {
+    return Array.from(categoryEl.querySelectorAll('.device')).find(el => el.dataset.name === name);
+}
+
+function cloneTemplate(id) {
+    return document.getElementById(id).content.firstElementChild.cloneNode(true);
+}
+
+// Данные устройства хранятся в data-* — их читает общий обработчик кликов
+function renderDevice(name, spec) {
+    const device = cloneTemplate('tpl-device');
+    device.dataset.name = name;
+    device.dataset.object = spec.object;
+    device.dataset.property = spec.property;
+    device.querySelector('.device-name').textContent = name;
+    device.querySelector('.device-object').textContent = spec.object;
+    device.querySelector('.device-property').textContent = spec.property;
+    return device;
+}
+
+function renderCategory(name, details) {
+    const category = cloneTemplate('tpl-category');
+    category.dataset.category = name;
+    category.querySelector('h2').textContent = `${name} (тип: ${details.type})`;
+    for (const [deviceName, spec] of Object.entries(details.devices || {})) {
+        category.appendChild(renderDevice(deviceName, spec));
+    }
+    return category;
+}
+
+function renderAliases(aliases) {
+    const frag = document.createDocumentFragment();
+    for (const [name, details] of Object.entries(aliases)) {
+        frag.appendChild(renderCategory(name, details));
+    }
+    document.getElementById('categories').replaceChildren(frag);
+}
+
+// Один делегированный обработчик на все кнопки категорий и устройств:
+// категория и устройство определяются по data-* ближайших карточек
+document.getElementById('categories').addEventListener('click', event => {
+    const button = event.target.closest('button');
+    if (!button) return;
+    const category = button.closest('.category').dataset.category;
+    if (button.classList.contains('delete-category')) {
+        deleteCategory(category);
+    } else if (button.classList.contains('add-device-btn')) {
+        addDevice(button);
+    } else if (button.classList.contains('edit-btn') || button.classList.contains('delete-btn')) {
+        const { name, object, property } = button.closest('.device').dataset;
+        if (button.classList.contains('edit-btn')) {
+            editDevice(category, name, object, property);
+        } else {
+            deleteDevice(category, name);
+        }
+    }
+});
+
+// Копия алиасов в sessionStorage: при переходах между страницами
+// дерево рисуется сразу, а свежие данные подтягиваются следом
+const ALIASES_KEY = 'aliases';
+
+function readCachedAliases() {
+    try {
+        const cached = sessionStorage.getItem(ALIASES_KEY);
+        return cached ? JSON.parse(cached) : null;
+    } catch (err) {
+        return null;
+    }
+}
+
+function dropAliasesCache() {
+    try {
+        sessionStorage.removeItem(ALIASES_KEY);
+    } catch (err) {}
+}
+
+async function loadAliases() {
+    const cached = readCachedAliases();
+    if (cached) renderAliases(cached);
+    try {
+        const res = await fetch('/api/aliases');
+        // Тело ошибки (401, 500) не алиасы: не кэшируем и не рисуем, остаётся прежний вид
+        if (!res.ok) throw new Error(`HTTP ${res.status}`);
+        const text = await res.text();
+        if (cached && text === sessionStorage.getItem(ALIASES_KEY)) return;
+        try {
+            sessionStorage.setItem(ALIASES_KEY, text);
+        } catch (err) {}
+        renderAliases(JSON.parse(text));
+    } catch (err) {
+        showMessage('Ошибка загрузки алиасов', true);
+        console.error('Ошибка загрузки алиасов:', err);
+    }
+}
+
+// Добавляет карточку устройства в категорию, создавая категорию при необходимости
+function placeDevice(category, type, deviceEl) {
+    let categoryEl = findCategory(category);
+    if (!categoryEl) {
+        categoryEl = renderCategory(category, { type, devices: {} });
+        document.getElementById('categories').appendChild(categoryEl);
+    }
+    categoryEl.appendChild(deviceEl);
+}
+
+// Статус обновления меняется редко — между переходами по страницам берём его из sessionStorage
+const UPDATE_STATUS_KEY = 'update_status';
+const UPDATE_STATUS_TTL = 60000; // мс
+
+async function fetchUpdateStatus() {
+    try {
+        const cached = JSON.parse(sessionStorage.getItem(UPDATE_STATUS_KEY));
+        if (cached && Date.now() - cached.t < UPDATE_STATUS_TTL) return cached.data;
+    } catch (err) {}
+    // Низкий приоритет: запрос не должен конкурировать с загрузкой алиасов
+    const resp = await fetch('/update/status', { priority: 'low' });
+    if (!resp.ok) throw new Error(`HTTP ${resp.status}`); // Ошибку не кэшируем
+    const data = await resp.json();
+    try {
+        sessionStorage.setItem(UPDATE_STATUS_KEY, JSON.stringify({ t: Date.now(), data }));
+    } catch (err) {}
+    return data;
+}
+
+async function checkForUpdate() {
+    try {
+        const data = await fetchUpdateStatus();
+        if (data.update_available) {
+            document.getElementById('update-notification').classList.add('show');
+        }
+    } catch (err) {
+        console.error('Ошибка проверки обновления:', err);
+    }
+}
+
+// === Обновление системы ===
+async function applyUpdate() {
+    if (!confirm('Обновить систему? Сервисы будут перезапущены.')) return;
+    const res = await fetch('/update/apply', {method: 'POST'});
+    const data = await res.json();
+    if (data.success) {
+        // Иначе после перезагрузки снова покажется устаревшее «Доступна новая версия»
+        try {
+            sessionStorage.removeItem(UPDATE_STATUS_KEY);
+        } catch (err) {}
+        alert('Система обновлена! Страница перезагрузится.');
+        location.reload();
+    } else {
+        alert('Ошибка: ' + (data.error || 'неизвестная'));
+    }
+}
+
+// === Редактирование устройства ===
+function editDevice(category, name, object, property) {
+    currentEdit = { category, name };
+    document.getElementById('edit_category').value = category;
+    document.getElementById('edit_name').value = name;
+    document.getElementById('edit_object').value = object;
+    document.getElementById('edit_property').value = property;
+    document.getElementById('editModal').style.display = 'block';
+}
+
+function closeModal() {
+    document.getElementById('editModal').style.display = 'none';
+}
+
+async function saveDevice() {
+    const name = document.getElementById('edit_name').value.trim();
+    const obj = document.getElementById('edit_object').value.trim();
+    const prop = document.getElementById('edit_property').value.trim();
+
+    if (!name || !obj || !prop) {
+        showMessage('Заполните все поля', true);
+        return;
+    }
+
+    const data = await apiCall('/api/device/edit', {
+        method: 'POST',
+        headers: JSON_H,
+        body: JSON.stringify({
+            old_category: currentEdit.category,
+            old_name: currentEdit.name,
+            new_category: document.getElementById('edit_category').value,
+            new_name: name,
+            object: obj,
+            property: prop
+        })
+    }, 'Устройство обновлено');
+    if (!data) return;
+
+    closeModal();
+    const oldCategoryEl = findCategory(currentEdit.category);
+    const oldEl = oldCategoryEl && findDevice(oldCategoryEl, currentEdit.name);
+    const newEl = renderDevice(data.name, data.device);
+    if (oldEl && currentEdit.category === data.category) {
+        oldEl.replaceWith(newEl);
+    } else {
+        if (oldEl) oldEl.remove();
+        placeDevice(data.category, data.type, newEl);
+    }
+}
+
+window.onclick = function(event) {
+    const modal = document.getElementById('editModal');
+    if (event.target == modal) {
+        closeModal();
+    }
+};
+
+async function exportAliases() {
+    const res = await fetch('/api/export');
+    const blob = await res.blob();
+    const url = window.URL.createObjectURL(blob);
+    const a = document.createElement('a');
+    a.href = url;
+    a.download = 'device_aliases.json';
+    document.body.appendChild(a);
+    a.click();
+    window.URL.revokeObjectURL(url);
+    document.body.removeChild(a);
+}
+
+async function importAliases(file) {
+    if (!file) return;
+    const formData = new FormData();
+    formData.append('file', file);
+    if (await apiCall('/api/import', { method: 'POST', body: formData }, 'Алиасы импортированы', 'Ошибка импорта')) {
+        loadAliases();
+    }
+}
+
+async function addCategory() {
+    const name = document.getElementById('new_category').value.trim();
+    const type = document.getElementById('new_category_type').value.trim();
+    if (!name) return;
+
+    const data = await apiCall('/api/category', {
+        method: 'POST',
+        headers: JSON_H,
+        body: JSON.stringify({ name, type: type }) // Передаём выбранный тип
+    }, 'Категория добавлена');
+    if (!data) return;
+    document.getElementById('categories').appendChild(renderCategory(data.category, data.details));
+    document.getElementById('new_category').value = '';
+}
+
+async function deleteCategory(name) {
+    if (!confirm('Удалить категорию и все её устройства?')) return;
+    const url = `/api/category/${encodeURIComponent(name)}`;
+    if (!await apiCall(url, { method: 'DELETE' }, 'Категория удалена', 'Ошибка удаления')) return;
+    const categoryEl = findCategory(name);
+    if (categoryEl) categoryEl.remove();
+}
+
+async function addDevice(button) {
+    const categoryEl = button.closest('.category');
+    const category = categoryEl.dataset.category;
+    const nameInput = categoryEl.querySelector('.new-device-name');
+    const objInput = categoryEl.querySelector('.new-device-object');
+    const propInput = categoryEl.querySelector('.new-device-property');
+    const name = nameInput.value.trim();
+    const obj = objInput.value.trim();
+    const prop = propInput.value.trim();
+
+    if (!name || !obj || !prop) {
+        showMessage('Заполните все поля', true);
+        return;
+    }
+
+    const data = await apiCall('/api/device', {
+        method: 'POST',
+        headers: JSON_H,
+        body: JSON.stringify({ category, name, object: obj, property: prop })
+    }, 'Устройство добавлено');
+    if (!data) return;
+    placeDevice(data.category, data.type, renderDevice(data.name, data.device));
+    nameInput.value = objInput.value = propInput.value = '';
+}
+
+async function deleteDevice(category, name) {
+    if (!confirm('Удалить устройство?')) return;
+    const url = '/api/device?' + new URLSearchParams({ category, name });
+    if (!await apiCall(url, { method: 'DELETE' }, 'Устройство удалено', 'Ошибка удаления')) return;
+    const categoryEl = findCategory(category);
+    const deviceEl = categoryEl && findDevice(categoryEl, name);
+    if (deviceEl) deviceEl.remove();
+}
+
+// Скрипт подключён с defer: DOM уже разобран
+loadAliases();
+// Проверяем обновления, когда браузер освободится после первой отрисовки
+if (window.requestIdleCallback) {
+    window.requestIdleCallback(checkForUpdate, { timeout: 2000 });
+} else {
+    setTimeout(checkForUpdate, 0);
+}"""
+
+LOGS_CSS = """#controls-container {
+    margin-bottom: 16px;
+    display: flex;
+    flex-wrap: wrap;
+    gap: 10px;
+    align-items: center;
+}
+#search-input {
+    padding: 8px;
+    border: 1px solid var(--border);
+    border-radius: 4px;
+    background: var(--input-bg);
+    color: var(--text);
+    flex-grow: 1;
+    min-width: 200px;
+}
+.control-group {
+    display: flex;
+    align-items: center;
+    gap: 5px;
+}
+#logs {
+    background: var(--card-bg);
+    border: 1px solid var(--border);
+    border-radius: 8px;
+    padding: 16px;
+    max-height: 60vh; /* Уменьшено для места под навигацию */
+    overflow-y: auto;
+}
+.log-entry {
+    padding: 8px;
+    border-bottom: 1px solid var(--border);
+    font-family: monospace;
+    font-size: 0.9rem;
+}
+.log-success { color: var(--success); }
+.log-error { color: var(--danger); }
+.export-link {
+    margin-top: 16px;
+    display: inline-block;
+    padding: 8px 16px;
+    background: var(--primary);
+    color: white;
+    text-decoration: none;
+    border-radius: 4px;
+}
+.pagination {
+    display: flex;
+    justify-content: center;
+    align-items: center;
+    gap: 10px;
+    margin-top: 10px;
+    flex-wrap: wrap;
+}
+.pagination button {
+    padding: 5px 10px;
+    border: 1px solid var(--border);
+    background: var(--input-bg);
+    color: var(--text);
+    cursor: pointer;
+    border-radius: 4px;
+}
+.pagination button:disabled {
+    cursor: not-allowed;
+    opacity: 0.5;
+}
+.pagination-info {
+    white-space: nowrap; /* Не переносить текст внутри */
+}"""
+
+LOGS_JS = r"""let autoRefresh = false;
+let autoRefreshTimer = null; // Следующий тик автообновления без EventSource (setTimeout)
+let logStream = null; // EventSource автообновления: новые записи с /logs/stream
+let currentPage = 1;
+let currentQuery = '';
+let currentPageSize = 100; // Начальное значение
+let totalRecords = 0;
+let totalPages = 1;
+let totalEstimated = false; // total при поиске — нижняя оценка
+let inflight = null; // AbortController текущего запроса к /logs/api
+let nextBeforeTs = null; // Курсор для «Показать ещё»: timestamp последней показанной записи
+
+// Недавние ответы /logs/api: повторный тот же запрос в течение LOGS_CACHE_TTL не идёт в сеть.
+// Map хранит порядок вставки — самый старый ключ вытесняется первым
+const logsCache = new Map();
+const LOGS_CACHE_TTL = 2000; // мс
+const LOGS_CACHE_SIZE = 16;
+
+// Последняя выдача поиска, в которую уместились все совпадения. Уточняющий запрос (содержит
+// прежний) может найти только её подмножество, поэтому его фильтруем локально, без запроса к серверу.
+// Сервер присылает для такой выдачи сырые строки лога (raw) — ищем по тому же тексту, что и он.
+// Выдача живёт LOCAL_SEARCH_TTL, чтобы не прятать записи, дописанные в лог позже
+let completeResult = null; // { query, logs, raw, t }
+const LOCAL_SEARCH_TTL = 30000; // мс
+
+// Записи не меняются после загрузки, поэтому строка деталей сериализуется один раз
+// и переиспользуется при повторной отрисовке (кэш страниц, локальный поиск)
+function entryDetails(entry) {
+    if (entry.ds === undefined) {
+        entry.ds = entry.d ? JSON.stringify(entry.d) : '';
+    }
+    return entry.ds;
+}
+
+// Регистр сравнивается как на сервере: ASCII-запрос ищется байтовым шаблоном, для которого
+// IGNORECASE касается только латиницы, остальные запросы — без учёта регистра целиком
+const NON_ASCII_RE = /[^\x00-\x7f]/;
+const lowerAscii = (s) => s.replace(/[A-Z]+/g, (m) => m.toLowerCase());
+
+function searchLocally(query, pageSize) {
+    const q = query.toLowerCase();
+    if (!completeResult || Date.now() - completeResult.t >= LOCAL_SEARCH_TTL || !q.includes(completeResult.query)) {
+        return null;
+    }
+    const fold = NON_ASCII_RE.test(q) ? (s) => s.toLowerCase() : lowerAscii;
+    const { logs, raw } = completeResult;
+    const found = [];
+    for (let i = 0; i < logs.length; i++) {
+        if (fold(raw[i]).includes(q)) found.push(logs[i]);
+    }
+    // Курсор «Показать ещё» — ISO-время, его здесь нет; следующие страницы придут с сервера
+    return { logs: found.slice(0, pageSize), total: found.length, estimated: false, next_before_ts: null };
+}
+
+async function fetchLogsPage(url, signal) {
+    const hit = logsCache.get(url);
+    if (hit && Date.now() - hit.t < LOGS_CACHE_TTL) return hit.data;
+    const response = await fetch(url, { signal });
+    const data = await response.json().catch(() => ({}));
+    // Ошибку не кэшируем и не отдаём как страницу — её покажет catch в loadLogs
+    if (!response.ok) throw new Error(data.error || `HTTP ${response.status}`);
+    logsCache.delete(url);
+    logsCache.set(url, { t: Date.now(), data });
+    if (logsCache.size > LOGS_CACHE_SIZE) logsCache.delete(logsCache.keys().next().value);
+    return data;
+}
+
+// Отрисовку откладываем до простоя браузера, чтобы не мешать вводу
+const whenIdle = window.requestIdleCallback
+    ? cb => window.requestIdleCallback(cb, { timeout: 100 })
+    : cb => setTimeout(cb, 0);
+
+// Один форматтер на все записи: создание Intl-объекта на каждую строку дорого
+const dateFormat = new Intl.DateTimeFormat(undefined, { dateStyle: 'short', timeStyle: 'medium' });
+
+// Откладывает вызов, пока события идут чаще, чем раз в ms
+const debounce = (fn, ms) => {
+    let t;
+    return (...a) => {
+        clearTimeout(t);
+        t = setTimeout(() => fn(...a), ms);
+    };
+};
+
+// Загрузка начальных логов и живой поиск по мере ввода
+document.addEventListener('DOMContentLoaded', () => {
+    loadLogs();
+    document.getElementById('search-input').addEventListener('input', debounce(searchLogs, 200));
+});
+
+// Скрытая вкладка не держит поток; при возвращении сразу показываем свежие логи
+document.addEventListener('visibilitychange', () => {
+    if (!autoRefresh) return;
+    if (document.hidden) {
+        closeLogStream();
+    } else {
+        loadLogs(currentQuery, 1, currentPageSize); // Заодно заново откроет поток
+    }
+});
+
+// Строка лога клонируется из <template>; текст не разбирается как HTML
+const logEntryTpl = document.getElementById('tpl-log-entry').content.firstElementChild;
+
+function renderLogEntry(entry) {
+    const div = logEntryTpl.cloneNode(true);
+    div.querySelector('.log-time').textContent = entry.ts != null ? dateFormat.format(entry.ts) : '—';
+    div.querySelector('.log-user').textContent = entry.u;
+    div.querySelector('.log-action').textContent = entry.a;
+    div.querySelector('.log-target').textContent = entry.t;
+    const mark = div.querySelector('.log-mark');
+    mark.className = entry.ok ? 'log-success' : 'log-error';
+    mark.textContent = entry.ok ? '✓' : '✗';
+    const details = entryDetails(entry);
+    if (details) {
+        const small = document.createElement('small');
+        small.textContent = details;
+        div.append(document.createElement('br'), small);
+    }
+    return div;
+}
+
+// Большая страница рисуется порциями: первая сразу, остальные — когда браузер свободен.
+// Очередь одна на все отрисовки, поэтому дозагруженные записи встают строго после прежних
+const LOG_RENDER_CHUNK = 200;
+let pendingLogs = []; // Записи, ещё не добавленные в DOM
+let pumpScheduled = false; // Пока очередь не пуста, следующая порция уже запланирована
+
+function takeLogChunk() {
+    const frag = document.createDocumentFragment();
+    for (const entry of pendingLogs.splice(0, LOG_RENDER_CHUNK)) {
+        frag.appendChild(renderLogEntry(entry));
+    }
+    return frag;
+}
+
+function schedulePump() {
+    if (pendingLogs.length && !pumpScheduled) {
+        pumpScheduled = true;
+        whenIdle(() => {
+            pumpScheduled = false;
+            document.getElementById('logs').appendChild(takeLogChunk());
+            schedulePump();
+        });
+    }
+}
+
+function renderLogs(logs, append = false) {
+    const container = document.getElementById('logs');
+    if (!append) {
+        pendingLogs = logs.slice();
+        container.replaceChildren(takeLogChunk());
+    } else if (pumpScheduled) {
+        pendingLogs.push(...logs);
+    } else {
+        pendingLogs = logs.slice();
+        container.appendChild(takeLogChunk());
+    }
+    schedulePump();
+}
+
+function setCursor(value) {
+    nextBeforeTs = value || null;
+    document.getElementById('load-more').hidden = !nextBeforeTs;
+}
+
+async function loadLogs(query = '', page = 1, pageSize = 100) {
+    // Сохраняем параметры для будущего использования
+    currentQuery = query;
+    currentPage = page;
+    currentPageSize = pageSize;
+
+    // Предыдущий запрос больше не нужен — отменяем, чтобы ответы не накладывались
+    if (inflight) inflight.abort();
+    const controller = new AbortController();
+    inflight = controller;
+
+    try {
+        // Строка параметров собирается один раз — для экспорта и для API
+        const params = new URLSearchParams({ query, page, page_size: pageSize }).toString();
+        document.getElementById('export-link').href = '/logs/export?' + params;
+
+        // При автообновлении нужны свежие данные — локально не фильтруем
+        const local = page === 1 && !autoRefresh ? searchLocally(query, pageSize) : null;
+        const data = local || await fetchLogsPage('/logs/api?' + params, controller.signal);
+        if (!local && data.raw) {
+            completeResult = { query: query.toLowerCase(), logs: data.logs, raw: data.raw, t: Date.now() };
+        }
+
+        // API возвращает { logs: [{ts, src, u, a, t, ok, d}, ...], total: N, estimated: bool, log_size: N }
+        const logs = data.logs;
+        totalRecords = data.total;
+        totalEstimated = !!data.estimated;
+        totalPages = Math.max(1, Math.ceil(totalRecords / pageSize));
+
+        whenIdle(() => {
+            if (controller.signal.aborted) return;
+
+            // Обновляем информацию о пагинации
+            document.getElementById('current-page').textContent = page;
+            document.getElementById('total-pages').textContent = totalPages;
+            // При поиске сервер считает совпадения не до конца — показываем «N+»
+            document.getElementById('total-records').textContent = totalEstimated ? `${totalRecords}+` : totalRecords;
+
+            // Включаем/выключаем кнопки
+            document.getElementById('prev-page').disabled = (page <= 1);
+            document.getElementById('next-page').disabled = (page >= totalPages);
+
+            renderLogs(logs);
+            setCursor(data.next_before_ts);
+            // Поток открывается только после отрисовки, иначе присланные строки стёр бы renderLogs
+            if (page === 1) syncLogStream(data.log_size);
+        });
+
+    } catch (err) {
+        if (err.name === 'AbortError') return; // Запрос заменён более новым
+        console.error('Ошибка загрузки логов:', err);
+        const errorEntry = document.createElement('div');
+        errorEntry.className = 'log-entry log-error';
+        errorEntry.textContent = `Ошибка загрузки: ${err.message}`;
+        pendingLogs = []; // Недорисованные записи прежней выдачи больше не нужны
+        document.getElementById('logs').replaceChildren(errorEntry);
+        // Сбрасываем информацию о пагинации при ошибке
+        document.getElementById('current-page').textContent = '1';
+        document.getElementById('total-pages').textContent = '1';
+        document.getElementById('total-records').textContent = '0';
+        document.getElementById('prev-page').disabled = true;
+        document.getElementById('next-page').disabled = true;
+        setCursor(null);
+    } finally {
+        if (inflight === controller) inflight = null;
+    }
+}
+
+// Дописывает следующую порцию старых записей по курсору — сервер не считает total
+let loadMoreError = null; // Строка с ошибкой последней дозагрузки
+
+async function loadMore() {
+    if (!nextBeforeTs) return;
+    if (inflight) inflight.abort();
+    const controller = new AbortController();
+    inflight = controller;
+    if (loadMoreError) {
+        loadMoreError.remove();
+        loadMoreError = null;
+    }
+    try {
+        const params = new URLSearchParams({ query: currentQuery, page_size: currentPageSize, before_ts: nextBeforeTs });
+        const response = await fetch('/logs/api?' + params, { signal: controller.signal });
+        const data = await response.json().catch(() => ({}));
+        if (!response.ok) throw new Error(data.error || `HTTP ${response.status}`);
+        renderLogs(data.logs, true);
+        setCursor(data.next_before_ts);
+    } catch (err) {
+        if (err.name === 'AbortError') return;
+        console.error('Ошибка загрузки логов:', err);
+        // Показанные записи и курсор не трогаем — ошибка дописывается в конец, «Показать ещё» можно повторить
+        loadMoreError = document.createElement('div');
+        loadMoreError.className = 'log-entry log-error';
+        loadMoreError.textContent = `Ошибка загрузки: ${err.message}`;
+        document.getElementById('logs').appendChild(loadMoreError);
+    } finally {
+        if (inflight === controller) inflight = null;
+    }
+}
+
+function searchLogs() {
+    const query = document.getElementById('search-input').value.trim();
+    loadLogs(query, 1, currentPageSize); // Начинаем с первой страницы при новом поиске
+}
+
+function changePageSize() {
+    const newSize = parseInt(document.getElementById('page-size').value);
+    currentPageSize = newSize;
+    // При смене размера страницы, возвращаемся к первой странице
+    loadLogs(currentQuery, 1, currentPageSize);
+}
+
+function prevPage() {
+    if (currentPage > 1) {
+        loadLogs(currentQuery, currentPage - 1, currentPageSize);
+    }
+}
+
+function nextPage() {
+    if (currentPage < totalPages) {
+        loadLogs(currentQuery, currentPage + 1, currentPageSize);
+    }
+}
+
+// Автообновление: сервер сам присылает новые записи через /logs/stream (SSE),
+// они дописываются в начало списка без перечитывания страницы.
+// Без EventSource или пока поток не открыт — опрос /logs/api раз в 5 секунд
+const LOG_STREAM_MAX_ROWS = 1000; // Длиннее список не растёт — перечитываем первую страницу
+
+function prependLogs(logs) {
+    // Свежие записи есть только на первой странице; на неё вернёмся через loadLogs
+    if (currentPage !== 1) return;
+    logsCache.clear(); // Закэшированные страницы и полная выдача поиска устарели
+    completeResult = null;
+    const container = document.getElementById('logs');
+    if (container.childElementCount + logs.length > LOG_STREAM_MAX_ROWS) {
+        loadLogs(currentQuery, 1, currentPageSize);
+        return;
+    }
+    const frag = document.createDocumentFragment();
+    for (const entry of logs) {
+        frag.appendChild(renderLogEntry(entry));
+    }
+    container.prepend(frag);
+    totalRecords += logs.length;
+    totalPages = Math.max(1, Math.ceil(totalRecords / currentPageSize));
+    document.getElementById('total-pages').textContent = totalPages;
+    document.getElementById('total-records').textContent = totalEstimated ? `${totalRecords}+` : totalRecords;
+    document.getElementById('next-page').disabled = (currentPage >= totalPages);
+}
+
+// Каждая загруженная первая страница заново открывает поток с того размера лога (log_size),
+// до которого её прочитал сервер: записи между чтением страницы и открытием потока
+// не теряются и не приходят дважды
+function syncLogStream(fromSize) {
+    closeLogStream();
+    if (!autoRefresh || !window.EventSource || document.hidden || fromSize == null) return;
+    const stream = new EventSource('/logs/stream?' + new URLSearchParams({ query: currentQuery, from: fromSize }));
+    stream.onmessage = (e) => prependLogs(JSON.parse(e.data));
+    // Файл логов пересоздан — дописывать не к чему, перечитываем страницу
+    stream.addEventListener('reset', () => loadLogs(currentQuery, 1, currentPageSize));
+    // Сам браузер переподключился бы с прежним from и повторил бы записи — закрываем поток
+    // и возвращаемся к опросу; первая удачная загрузка страницы откроет его снова
+    stream.onerror = () => {
+        closeLogStream();
+        if (autoRefresh && !autoRefreshTimer) autoRefreshTimer = setTimeout(autoRefreshTick, 5000);
+    };
+    logStream = stream;
+    clearTimeout(autoRefreshTimer);
+    autoRefreshTimer = null;
+}
+
+function closeLogStream() {
+    if (logStream) {
+        logStream.close();
+        logStream = null;
+    }
+}
+
+// Следующее обновление планируется только после завершения текущего,
+// поэтому медленный сервер не получает наложенных друг на друга запросов
+async function autoRefreshTick() {
+    autoRefreshTimer = null;
+    // Скрытая вкладка не обновляется — догоним по visibilitychange
+    if (!document.hidden) {
+        await loadLogs(currentQuery, 1, currentPageSize); // Сброс на 1-ю страницу
+    }
+    // Пока шёл запрос, автообновление могли выключить и включить заново — тогда тик уже запланирован.
+    // Открытый поток (его откроет отрисовка загруженной страницы) снимает этот тик сам
+    if (autoRefresh && !autoRefreshTimer && !logStream) {
+        autoRefreshTimer = setTimeout(autoRefreshTick, 5000); // Обновление каждые 5 секунд
+    }
+}
+
+function toggleAutoRefresh() {
+    autoRefresh = !autoRefresh;
+    clearTimeout(autoRefreshTimer);
+    autoRefreshTimer = null;
+    closeLogStream();
+    if (autoRefresh) {
+        if (window.EventSource) {
+            autoRefreshTick(); // Сразу перечитываем первую страницу, её отрисовка откроет поток
+        } else {
+            autoRefreshTimer = setTimeout(autoRefreshTick, 5000);
+        }
+    }
+    document.getElementById('auto-refresh-status').textContent = autoRefresh ? 'Вкл' : 'Выкл';
+}"""
+
+def _minify(mimetype, text):
+    if mimetype == "text/css" and rcssmin is not None:
+        return rcssmin.cssmin(text)
+    if mimetype == "application/javascript" and rjsmin is not None:
+        return rjsmin.jsmin(text)
+    return text
+
+def _build_assets(sources):
+    """Готовит ресурсы один раз: имя -> (mimetype, байты, версия по хэшу содержимого)."""
+    assets = {}
+    for name, (mimetype, text) in sources.items():
+        body = _minify(mimetype, text).encode("utf-8")
+        assets[name] = (mimetype, body, hashlib.sha1(body).hexdigest()[:12])
+    return assets
+
+_ASSETS = _build_assets({
+    "theme.css": ("text/css", THEME_CSS),
+    "theme.js": ("application/javascript", THEME_JS),
+    "index.css": ("text/css", INDEX_CSS),
+    "index.js": ("application/javascript", INDEX_JS),
+    "logs.css": ("text/css", LOGS_CSS),
+    "logs.js": ("application/javascript", LOGS_JS),
+})
+
+# Адреса экранируются один раз здесь, а не при каждом рендере шаблона
+_ASSET_URLS = {name: Markup.escape(f"/assets/{name}?v={version}")
+               for name, (_, _, version) in _ASSETS.items()}
+
+def asset_url(name):
+    """URL ресурса с версией: при изменении содержимого меняется и адрес."""
+    return _ASSET_URLS[name]
+
+# Тема берётся только из известного набора — значения заранее безопасны для HTML
+THEMES = {name: Markup(name) for name in ("light", "dark")}
+
+def current_theme():
+    return THEMES.get(request.cookies.get("theme"), THEMES["light"])
+
 # === Шаблоны ===
 HTML_TEMPLATE = """<!DOCTYPE html>
-<html data-theme="{{ request.cookies.get('theme', 'light') }}">
+<html data-theme="{{ theme }}">
 <head>
     <meta charset="utf-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Редактор алиасов MajorDoMo</title>
-    <style>
-        :root {
-            --bg: #ffffff;
-            --text: #333333;
-            --card-bg: #ffffff;
-            --border: #e0e0e0;
-            --input-bg: #f5f5f5;
-            --success: #28a745;
-            --warning: #ffc107;
-            --danger: #dc3545;
-            --primary: #007bff;
-        }
-        [data-theme="dark"] {
-            --bg: #121212;
-            --text: #e0e0e0;
-            --card-bg: #1e1e1e;
-            --border: #333333;
-            --input-bg: #2c2c2c;
-        }
-        body {
-            font-family: Arial, sans-serif;
-            background-color: var(--bg);
-            color: var(--text);
-            margin: 0;
-            padding: 16px;
-            transition: background-color 0.3s, color 0.3s;
-        }
-        .container {
-            max-width: 1200px;
-            margin: 0 auto;
-        }
-        header {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            margin-bottom: 16px;
-        }
-        h1 {
-            margin: 0;
-        }
-        #theme-toggle {
-            background: none;
-            border: 1px solid var(--border);
-            color: var(--text);
-            padding: 4px 8px;
-            cursor: pointer;
-            border-radius: 4px;
-        }
-        #update-notification {
-            background: var(--warning);
-            color: #000;
-            padding: 8px;
-            border-radius: 4px;
-            margin-bottom: 16px;
-            display: none;
-            text-align: center;
-        }
-        .category {
-            background: var(--card-bg);
-            border: 1px solid var(--border);
-            border-radius: 8px;
-            padding: 16px;
-            margin-bottom: 16px;
-        }
-        .category-header {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            margin-bottom: 16px;
-        }
-        .add-device {
-            background: var(--input-bg);
-            padding: 16px;
-            border-radius: 8px;
-            margin-bottom: 16px;
-        }
-        .add-category {
-            background: var(--input-bg);
-            padding: 16px;
-            border-radius: 8px;
-            margin-bottom: 16px;
-            display: flex;
-            flex-direction: column;
-            gap: 8px;
-        }
-        @media (min-width: 600px) {
-            .add-category {
-                flex-direction: row;
-                gap: 8px;
-            }
-        }
-        .add-category input, .add-category select {
-            padding: 8px;
-            border: 1px solid var(--border);
-            border-radius: 4px;
-            background: var(--input-bg);
-            color: var(--text);
-        }
-        .add-category-btn {
-            background: var(--success);
-            color: white;
-            border: none;
-            padding: 8px 16px;
-            border-radius: 4px;
-            cursor: pointer;
-            font-size: 1rem;
-        }
-        .device-fields {
-            display: flex;
-            flex-direction: column;
-            gap: 8px;
-        }
-        .device-fields input {
-            padding: 8px;
-            border: 1px solid var(--border);
-            border-radius: 4px;
-            background: var(--input-bg);
-            color: var(--text);
-        }
-        .add-device-btn {
-            background: var(--success);
-            color: white;
-            border: none;
-            padding: 10px;
-            border-radius: 4px;
-            cursor: pointer;
-            font-size: 1rem;
-            width: 100%;
-            margin-top: 8px;
-        }
-        .device {
-            padding: 16px;
-            border-bottom: 1px solid var(--border);
-        }
-        .device:last-child {
-            border-bottom: none;
-        }
-        .device-header {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            margin-bottom: 8px;
-        }
-        .device-name {
-            font-weight: bold;
-            font-size: 1.1rem;
-        }
-        .device-actions button {
-            margin-left: 6px;
-            padding: 4px 8px;
-            border: none;
-            border-radius: 4px;
-            cursor: pointer;
-            font-size: 12px;
-        }
-        .edit-btn { background: var(--warning); color: #000; }
-        .delete-btn { background: var(--danger); color: white; }
-        .device-details {
-            font-size: 0.9rem;
-            color: #888;
-        }
-        @media (min-width: 600px) {
-            .device-fields {
-                flex-direction: row;
-                gap: 8px;
-            }
-            .device-fields input {
-                flex: 1;
-            }
-        }
-        .export-import {
-            text-align: center;
-            margin: 16px 0;
-        }
-        .export-import button {
-            margin: 0 8px;
-            padding: 8px 16px;
-            border: none;
-            border-radius: 4px;
-            cursor: pointer;
-            font-size: 1rem;
-        }
-        .export-btn { background: var(--success); color: white; }
-        .import-btn { background: var(--primary); color: white; }
-        /* Уведомление об обновлении */
-        #update-notification.show {
-            display: block;
-        }
-        .modal {
-            display: none;
-            position: fixed;
-            z-index: 1000;
-            left: 0;
-            top: 0;
-            width: 100%;
-            height: 100%;
-            background-color: rgba(0,0,0,0.4);
-        }
-        .modal-content {
-            background-color: var(--card-bg);
-            margin: 15% auto;
-            padding: 20px;
-            border: 1px solid var(--border);
-            border-radius: 8px;
-            width: 80%;
-            max-width: 500px;
-        }
-        .modal-header {
-            margin-bottom: 16px;
-        }
-        .modal-actions {
-            margin-top: 16px;
-            text-align: right;
-        }
-        .modal-actions button {
-            padding: 6px 12px;
-            margin-left: 8px;
-            border: none;
-            border-radius: 4px;
-            cursor: pointer;
-        }
-        .save-btn { background: var(--success); color: white; }
-        .cancel-btn { background: var(--danger); color: white; margin-left: 8px; }
-    </style>
+    <link rel="stylesheet" href="{{ asset_url('theme.css') }}">
+    <link rel="stylesheet" href="{{ asset_url('index.css') }}">
 </head>
 <body>
     <div class="container">
-        <div id="update-notification">Доступна новая версия! <button onclick="applyUpdate()" style="margin-left:10px;">Обновить</button></div>
+        <div id="update-notification">Доступна новая версия! <button onclick="applyUpdate()">Обновить</button></div>
         <header>
             <h1>Редактор алиасов MajorDoMo</h1>
             <button id="theme-toggle" onclick="toggleTheme()">🌓</button>
@@ -464,7 +1794,7 @@ HTML_TEMPLATE = """<!DOCTYPE html>
         <div class="export-import">
             <button class="export-btn" onclick="exportAliases()">📤 Экспорт JSON</button>
             <button class="import-btn" onclick="document.getElementById('import-file').click()">📥 Импорт JSON</button>
-            <input type="file" id="import-file" accept=".json" style="display:none;" onchange="importAliases(this.files[0])">
+            <input type="file" id="import-file" accept=".json" onchange="importAliases(this.files[0])">
 			<a href="/logs" class="export-btn">📋 Логи</a>
         </div>
         <div id="status"></div>
@@ -478,35 +1808,38 @@ HTML_TEMPLATE = """<!DOCTYPE html>
             </select>
             <button class="add-category-btn" onclick="addCategory()">Добавить категорию</button>
         </div>
-        {% for category, details in aliases.items() %}
+        <div id="categories"></div>
+    </div>
+
+    <!-- Шаблоны карточек: заполняются на клиенте из /api/aliases -->
+    <template id="tpl-category">
         <div class="category">
             <div class="category-header">
-                <h2>{{ category }} (тип: {{ details.type }})</h2>
-                <button class="delete-category" onclick="deleteCategory('{{ category }}')">🗑️</button>
+                <h2></h2>
+                <button class="delete-category">🗑️</button>
             </div>
             <div class="add-device">
                 <div class="device-fields">
-                    <input type="text" id="device_name_{{ loop.index }}" placeholder="Имя (например, улица)">
-                    <input type="text" id="object_{{ loop.index }}" placeholder="Объект (Relay01)">
-                    <input type="text" id="property_{{ loop.index }}" placeholder="Свойство (status)">
+                    <input type="text" class="new-device-name" placeholder="Имя (например, улица)">
+                    <input type="text" class="new-device-object" placeholder="Объект (Relay01)">
+                    <input type="text" class="new-device-property" placeholder="Свойство (status)">
                 </div>
-                <button class="add-device-btn" onclick="addDevice('{{ category }}', {{ loop.index }})">Добавить устройство</button>
+                <button class="add-device-btn">Добавить устройство</button>
             </div>
-            {% for device_key, device_spec in details.devices.items() %}
-            <div class="device">
-                <div class="device-header">
-                    <div class="device-name">{{ device_key }}</div>
-                    <div class="device-actions">
-                        <button class="edit-btn" onclick="editDevice('{{ category }}', '{{ device_key|e }}', '{{ device_spec.object|e }}', '{{ device_spec.property|e }}')">✏️</button>
-                        <button class="delete-btn" onclick="deleteDevice('{{ category }}', '{{ device_key|e }}')">🗑️</button>
-                    </div>
+        </div>
+    </template>
+    <template id="tpl-device">
+        <div class="device">
+            <div class="device-header">
+                <div class="device-name"></div>
+                <div class="device-actions">
+                    <button class="edit-btn">✏️</button>
+                    <button class="delete-btn">🗑️</button>
                 </div>
-                <div class="device-details">Объект: {{ device_spec.object }}<br>Свойство: {{ device_spec.property }}</div>
             </div>
-            {% endfor %}
+            <div class="device-details">Объект: <span class="device-object"></span><br>Свойство: <span class="device-property"></span></div>
         </div>
-        {% endfor %}
-    </div>
+    </template>
 
     <!-- Модальное окно редактирования -->
     <div id="editModal" class="modal">
@@ -515,10 +1848,10 @@ HTML_TEMPLATE = """<!DOCTYPE html>
                 <h2>Редактировать устройство</h2>
             </div>
             <div>
-                <input type="text" id="edit_category" placeholder="Категория" readonly style="width:100%; margin-bottom:8px;">
-                <input type="text" id="edit_name" placeholder="Имя (через запятую)" style="width:100%; margin-bottom:8px;">
-                <input type="text" id="edit_object" placeholder="Объект" style="width:100%; margin-bottom:8px;">
-                <input type="text" id="edit_property" placeholder="Свойство" style="width:100%; margin-bottom:8px;">
+                <input type="text" id="edit_category" placeholder="Категория" readonly>
+                <input type="text" id="edit_name" placeholder="Имя (через запятую)">
+                <input type="text" id="edit_object" placeholder="Объект">
+                <input type="text" id="edit_property" placeholder="Свойство">
             </div>
             <div class="modal-actions">
                 <button class="save-btn" onclick="saveDevice()">Сохранить</button>
@@ -527,330 +1860,19 @@ HTML_TEMPLATE = """<!DOCTYPE html>
         </div>
     </div>
 
-    <script>
-        let currentEdit = { category: '', name: '' };
-
-        function showMessage(msg, isError = false) {
-            const status = document.getElementById('status');
-            status.innerHTML = `<div style="padding: 8px; margin: 8px 0; border-radius: 4px; background: ${isError ? '#f8d7da' : '#d4edda'}; color: ${isError ? '#721c24' : '#155724'};">${msg}</div>`;
-        }
-
-        function toggleTheme() {
-            const currentTheme = document.documentElement.getAttribute('data-theme');
-            const newTheme = currentTheme === 'dark' ? 'light' : 'dark';
-            document.documentElement.setAttribute('data-theme', newTheme);
-            document.cookie = `theme=${newTheme}; path=/; max-age=31536000`; // 1 year
-        }
-
-        // Загрузка темы из cookie при запуске
-        document.addEventListener('DOMContentLoaded', () => {
-            const savedTheme = document.cookie.replace(/(?:(?:^|.*;\s*)theme\s*\=\s*([^;]*).*$)|^.*$/, "$1");
-            if (savedTheme) {
-                document.documentElement.setAttribute('data-theme', savedTheme);
-            }
-        });
-
-        async function checkForUpdate() {
-            try {
-                const resp = await fetch('/update/status');
-                const data = await resp.json();
-                if (data.update_available) {
-                    document.getElementById('update-notification').classList.add('show');
-                }
-            } catch (err) {
-                console.error('Ошибка проверки обновления:', err);
-            }
-        }
-
-        // === Обновление системы ===
-        async function applyUpdate() {
-            if (!confirm('Обновить систему? Сервисы будут перезапущены.')) return;
-            const res = await fetch('/update/apply', {method: 'POST'});
-            const data = await res.json();
-            if (data.success) {
-                alert('Система обновлена! Страница перезагрузится.');
-                location.reload();
-            } else {
-                alert('Ошибка: ' + (data.error || 'неизвестная'));
-            }
-        }
-
-        // === Редактирование устройства ===
-        function editDevice(category, name, object, property) {
-            currentEdit = { category, name };
-            document.getElementById('edit_category').value = category;
-            document.getElementById('edit_name').value = name;
-            document.getElementById('edit_object').value = object;
-            document.getElementById('edit_property').value = property;
-            document.getElementById('editModal').style.display = 'block';
-        }
-
-        function closeModal() {
-            document.getElementById('editModal').style.display = 'none';
-        }
-
-        async function saveDevice() {
-            const name = document.getElementById('edit_name').value.trim();
-            const obj = document.getElementById('edit_object').value.trim();
-            const prop = document.getElementById('edit_property').value.trim();
-
-            if (!name || !obj || !prop) {
-                showMessage('Заполните все поля', true);
-                return;
-            }
-
-            const res = await fetch('/api/device/edit', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({
-                    old_category: currentEdit.category,
-                    old_name: currentEdit.name,
-                    new_category: document.getElementById('edit_category').value,
-                    new_name: name,
-                    object: obj,
-                    property: prop
-                })
-            });
-
-            if (res.ok) {
-                showMessage('Устройство обновлено');
-                closeModal();
-                location.reload();
-            } else {
-                const err = await res.json();
-                showMessage(err.error || 'Ошибка', true);
-            }
-        }
-
-        window.onclick = function(event) {
-            const modal = document.getElementById('editModal');
-            if (event.target == modal) {
-                closeModal();
-            }
-        };
-
-        async function exportAliases() {
-            const res = await fetch('/api/export');
-            const blob = await res.blob();
-            const url = window.URL.createObjectURL(blob);
-            const a = document.createElement('a');
-            a.href = url;
-            a.download = 'device_aliases.json';
-            document.body.appendChild(a);
-            a.click();
-            window.URL.revokeObjectURL(url);
-            document.body.removeChild(a);
-        }
-
-        async function importAliases(file) {
-            if (!file) return;
-            const formData = new FormData();
-            formData.append('file', file);
-            const res = await fetch('/api/import', { method: 'POST', body: formData });
-            if (res.ok) {
-                showMessage('Алиасы импортированы');
-                location.reload();
-            } else {
-                const err = await res.json();
-                showMessage(err.error || 'Ошибка импорта', true);
-            }
-        }
-
-        async function addCategory() {
-            const name = document.getElementById('new_category').value.trim();
-            const type = document.getElementById('new_category_type').value.trim();
-            if (!name) return;
-
-            const res = await fetch('/api/category', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ name, type: type }) // Передаём выбранный тип
-            });
-            if (res.ok) {
-                showMessage('Категория добавлена');
-                location.reload();
-            } else {
-                const err = await res.json();
-                showMessage(err.error || 'Ошибка', true);
-            }
-        }
-
-        async function deleteCategory(name) {
-            if (!confirm('Удалить категорию и все её устройства?')) return;
-            const res = await fetch(`/api/category/${encodeURIComponent(name)}`, { method: 'DELETE' });
-            if (res.ok) {
-                showMessage('Категория удалена');
-                location.reload();
-            } else {
-                showMessage('Ошибка удаления', true);
-            }
-        }
-
-        async function addDevice(category, idx) {
-            const name = document.getElementById(`device_name_${idx}`).value.trim();
-            const obj = document.getElementById(`object_${idx}`).value.trim();
-            const prop = document.getElementById(`property_${idx}`).value.trim();
-
-            if (!name || !obj || !prop) {
-                showMessage('Заполните все поля', true);
-                return;
-            }
-
-            const res = await fetch('/api/device', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ category, name, object: obj, property: prop })
-            });
-            if (res.ok) {
-                showMessage('Устройство добавлено');
-                location.reload();
-            } else {
-                const err = await res.json();
-                showMessage(err.error || 'Ошибка', true);
-            }
-        }
-
-        async function deleteDevice(category, name) {
-            if (!confirm('Удалить устройство?')) return;
-            const res = await fetch(`/api/device?category=${encodeURIComponent(category)}&name=${encodeURIComponent(name)}`, { method: 'DELETE' });
-            if (res.ok) {
-                showMessage('Устройство удалено');
-                location.reload();
-            } else {
-                showMessage('Ошибка удаления', true);
-            }
-        }
-
-        // Проверяем обновления при загрузке
-        checkForUpdate();
-    </script>
+    <script src="{{ asset_url('theme.js') }}" defer></script>
+    <script src="{{ asset_url('index.js') }}" defer></script>
 </body>
 </html>"""
 
 LOGS_TEMPLATE = """<!DOCTYPE html>
-<html data-theme="{{ request.cookies.get('theme', 'light') }}">
+<html data-theme="{{ theme }}">
 <head>
     <meta charset="utf-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Логи MajorDoMo MCP</title>
-    <style>
-        :root {
-            --bg: #ffffff;
-            --text: #333333;
-            --card-bg: #ffffff;
-            --border: #e0e0e0;
-            --input-bg: #f5f5f5;
-            --success: #28a745;
-            --warning: #ffc107;
-            --danger: #dc3545;
-            --primary: #007bff;
-        }
-        [data-theme="dark"] {
-            --bg: #121212;
-            --text: #e0e0e0;
-            --card-bg: #1e1e1e;
-            --border: #333333;
-            --input-bg: #2c2c2c;
-        }
-        body {
-            font-family: Arial, sans-serif;
-            background-color: var(--bg);
-            color: var(--text);
-            margin: 0;
-            padding: 16px;
-            transition: background-color 0.3s, color 0.3s;
-        }
-        .container {
-            max-width: 1200px;
-            margin: 0 auto;
-        }
-        header {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            margin-bottom: 16px;
-        }
-        h1 {
-            margin: 0;
-        }
-        #theme-toggle {
-            background: none;
-            border: 1px solid var(--border);
-            color: var(--text);
-            padding: 4px 8px;
-            cursor: pointer;
-            border-radius: 4px;
-        }
-        #controls-container {
-            margin-bottom: 16px;
-            display: flex;
-            flex-wrap: wrap;
-            gap: 10px;
-            align-items: center;
-        }
-        #search-input {
-            padding: 8px;
-            border: 1px solid var(--border);
-            border-radius: 4px;
-            background: var(--input-bg);
-            color: var(--text);
-            flex-grow: 1;
-            min-width: 200px;
-        }
-        .control-group {
-            display: flex;
-            align-items: center;
-            gap: 5px;
-        }
-        #logs {
-            background: var(--card-bg);
-            border: 1px solid var(--border);
-            border-radius: 8px;
-            padding: 16px;
-            max-height: 60vh; /* Уменьшено для места под навигацию */
-            overflow-y: auto;
-        }
-        .log-entry {
-            padding: 8px;
-            border-bottom: 1px solid var(--border);
-            font-family: monospace;
-            font-size: 0.9rem;
-        }
-        .log-success { color: var(--success); }
-        .log-error { color: var(--danger); }
-        .export-link {
-            margin-top: 16px;
-            display: inline-block;
-            padding: 8px 16px;
-            background: var(--primary);
-            color: white;
-            text-decoration: none;
-            border-radius: 4px;
-        }
-        .pagination {
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            gap: 10px;
-            margin-top: 10px;
-            flex-wrap: wrap;
-        }
-        .pagination button {
-            padding: 5px 10px;
-            border: 1px solid var(--border);
-            background: var(--input-bg);
-            color: var(--text);
-            cursor: pointer;
-            border-radius: 4px;
-        }
-        .pagination button:disabled {
-            cursor: not-allowed;
-            opacity: 0.5;
-        }
-        .pagination-info {
-            white-space: nowrap; /* Не переносить текст внутри */
-        }
-    </style>
+    <link rel="stylesheet" href="{{ asset_url('theme.css') }}">
+    <link rel="stylesheet" href="{{ asset_url('logs.css') }}">
 </head>
 <body>
     <div class="container">
@@ -860,7 +1882,7 @@ LOGS_TEMPLATE = """<!DOCTYPE html>
             <button id="theme-toggle" onclick="toggleTheme()">🌓</button>
         </header>
         <div id="controls-container">
-            <input type="text" id="search-input" placeholder="Поиск в логах..." onkeyup="if(event.key === 'Enter') searchLogs()">
+            <input type="text" id="search-input" placeholder="Поиск в логах...">
             <button onclick="searchLogs()">Найти</button>
             <button onclick="toggleAutoRefresh()">Автообновление: <span id="auto-refresh-status">Выкл</span></button>
             <div class="control-group">
@@ -876,6 +1898,9 @@ LOGS_TEMPLATE = """<!DOCTYPE html>
             </div>
         </div>
         <div id="logs"></div>
+        <div class="pagination">
+            <button id="load-more" onclick="loadMore()" hidden>Показать ещё</button>
+        </div>
         <div class="pagination">
             <button id="prev-page" onclick="prevPage()" disabled>Предыдущая</button>
             <div class="pagination-info">
@@ -885,138 +1910,96 @@ LOGS_TEMPLATE = """<!DOCTYPE html>
         </div>
         <a id="export-link" class="export-link" href="/logs/export">📥 Экспорт CSV</a>
     </div>
-    <script>
-        let autoRefreshInterval = null;
-        let currentPage = 1;
-        let currentQuery = '';
-        let currentPageSize = 100; // Начальное значение
-        let totalRecords = 0;
-        let totalPages = 1;
-
-        function toggleTheme() {
-            const currentTheme = document.documentElement.getAttribute('data-theme');
-            const newTheme = currentTheme === 'dark' ? 'light' : 'dark';
-            document.documentElement.setAttribute('data-theme', newTheme);
-            document.cookie = `theme=${newTheme}; path=/; max-age=31536000`; // 1 year
-        }
-
-        // Загрузка темы из cookie при запуске
-        document.addEventListener('DOMContentLoaded', () => {
-            const savedTheme = document.cookie.replace(/(?:(?:^|.*;\s*)theme\s*\=\s*([^;]*).*$)|^.*$/, "$1");
-            if (savedTheme) {
-                document.documentElement.setAttribute('data-theme', savedTheme);
-            }
-            // Загрузка начальных логов
-            loadLogs();
-        });
-
-        async function loadLogs(query = '', page = 1, pageSize = 100) {
-            // Сохраняем параметры для будущего использования
-            currentQuery = query;
-            currentPage = page;
-            currentPageSize = pageSize;
-
-            try {
-                // Обновляем URL-параметры для экспорта
-                const exportUrl = `/logs/export?query=${encodeURIComponent(query)}&page=${page}&page_size=${pageSize}`;
-                document.getElementById('export-link').href = exportUrl;
-
-                const response = await fetch(`/logs/api?query=${encodeURIComponent(query)}&page=${page}&page_size=${pageSize}`);
-                const data = await response.json();
-                
-                // Предполагаем, что API возвращает объект { logs: [...], total: N }
-                const logs = data.logs || data; // Совместимость, если вдруг придет только массив
-                totalRecords = data.total || logs.length; // Если total нет, используем длину массива (не точно)
-                totalPages = Math.ceil(totalRecords / pageSize);
-
-                // Обновляем информацию о пагинации
-                document.getElementById('current-page').textContent = page;
-                document.getElementById('total-pages').textContent = totalPages;
-                document.getElementById('total-records').textContent = totalRecords;
-
-                // Включаем/выключаем кнопки
-                document.getElementById('prev-page').disabled = (page <= 1);
-                document.getElementById('next-page').disabled = (page >= totalPages);
-
-                document.getElementById('logs').innerHTML = logs.map(entry => `
-                    <div class="log-entry">
-                        <b>${new Date(entry.timestamp).toLocaleString()}</b> |
-                        <b>${entry.user}</b> → ${entry.action} (${entry.target}) ${entry.success ? '<span class="log-success">✓</span>' : '<span class="log-error">✗</span>'}
-                        ${entry.details ? `<br><small>${JSON.stringify(entry.details)}</small>` : ''}
-                    </div>
-                `).join('');
-
-            } catch (err) {
-                console.error('Ошибка загрузки логов:', err);
-                document.getElementById('logs').innerHTML = `<div class="log-entry log-error">Ошибка загрузки: ${err.message}</div>`;
-                // Сбрасываем информацию о пагинации при ошибке
-                document.getElementById('current-page').textContent = '1';
-                document.getElementById('total-pages').textContent = '1';
-                document.getElementById('total-records').textContent = '0';
-                document.getElementById('prev-page').disabled = true;
-                document.getElementById('next-page').disabled = true;
-            }
-        }
 
-        function searchLogs() {
-            const query = document.getElementById('search-input').value.trim();
-            loadLogs(query, 1, currentPageSize); // Начинаем с первой страницы при новом поиске
-        }
-
-        function changePageSize() {
-            const newSize = parseInt(document.getElementById('page-size').value);
-            currentPageSize = newSize;
-            // При смене размера страницы, возвращаемся к первой странице
-            loadLogs(currentQuery, 1, currentPageSize);
-        }
+    <!-- Шаблон строки лога: заполняется на клиенте из /logs/api -->
+    <template id="tpl-log-entry">
+        <div class="log-entry"><b class="log-time"></b> | <b class="log-user"></b> → <span class="log-action"></span> (<span class="log-target"></span>) <span class="log-mark"></span></div>
+    </template>
+    <script src="{{ asset_url('theme.js') }}" defer></script>
+    <script src="{{ asset_url('logs.js') }}" defer></script>
+</body>
+</html>"""
 
-        function prevPage() {
-            if (currentPage > 1) {
-                loadLogs(currentQuery, currentPage - 1, currentPageSize);
-            }
-        }
+def _make_bytecode_cache():
+    """Байткод шаблонов на диске переживает перезапуск сервиса."""
+    try:
+        os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+        return FileSystemBytecodeCache(JINJA_CACHE_DIR, "__jinja_%s.cache")
+    except OSError as e:
+        print(f"Кэш шаблонов отключён: {e}", file=sys.stderr)
+        return None
 
-        function nextPage() {
-            if (currentPage < totalPages) {
-                loadLogs(currentQuery, currentPage + 1, currentPageSize);
-            }
-        }
+# Шаблоны компилируются один раз при импорте, а не на каждый запрос
+_JINJA_ENV = Environment(
+    loader=DictLoader({"index.html": HTML_TEMPLATE, "logs.html": LOGS_TEMPLATE}),
+    autoescape=True,
+    auto_reload=False,
+    # Не выводим переводы строк и отступы вокруг тегов {% %}
+    trim_blocks=True,
+    lstrip_blocks=True,
+    bytecode_cache=_make_bytecode_cache(),
+)
+_JINJA_ENV.globals["asset_url"] = asset_url
+_PAGE_TEMPLATES = {"index": _JINJA_ENV.get_template("index.html"),
+                   "logs": _JINJA_ENV.get_template("logs.html")}
+
+@lru_cache(maxsize=None)
+def render_page(name, theme):
+    """Оболочка страницы зависит только от темы и версий ресурсов — рендерим один раз на тему."""
+    return _PAGE_TEMPLATES[name].render(theme=theme).encode("utf-8")
+
+@app.route("/assets/<name>")
+def static_asset(name):
+    if name not in _ASSETS:
+        return jsonify({"error": "Не найдено"}), 404
+    mimetype, body, version = _ASSETS[name]
+    response = Response(body, mimetype=mimetype)
+    # Адрес содержит версию, поэтому ресурс можно кэшировать навсегда
+    response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    # Слабый ETag: flask-compress дописывает к сильному алгоритм сжатия, и он перестаёт совпадать
+    response.set_etag(version, weak=True)
+    return response.make_conditional(request)
+
+def state_etag(*parts):
+    """Короткий ETag по набору значений, определяющих содержимое ответа."""
+    digest = hashlib.blake2b(digest_size=8)
+    for part in parts:
+        digest.update(repr(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def revalidated(etag, build):
+    """Ответ с проверкой по ETag: при совпадении If-None-Match тело не строится вовсе."""
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = make_response(build())
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = "private, max-age=0, must-revalidate"
+    return response
 
-        function toggleAutoRefresh() {
-            if (autoRefreshInterval) {
-                clearInterval(autoRefreshInterval);
-                autoRefreshInterval = null;
-                document.getElementById('auto-refresh-status').textContent = 'Выкл';
-            } else {
-                autoRefreshInterval = setInterval(() => {
-                    // При автообновлении, возможно, нужно оставаться на текущей странице
-                    // и использовать текущий размер страницы.
-                    // loadLogs(currentQuery, currentPage, currentPageSize);
-                    // Или сбросить на первую страницу при обновлении?
-                    loadLogs(currentQuery, 1, currentPageSize); // Пример: сброс на 1-ю страницу
-                }, 5000); // Обновление каждые 5 секунд
-                document.getElementById('auto-refresh-status').textContent = 'Вкл';
-            }
-        }
-    </script>
-</body>
-</html>"""
+# Версия оболочки страниц: меняется вместе с ресурсами
+_ASSETS_STATE = tuple(sorted((name, version) for name, (_, _, version) in _ASSETS.items()))
 
 @app.route("/")
 @requires_auth
 def index():
-    try:
-        # Загружаем оригинальную структуру
-        raw_aliases = load_aliases()
-        return render_template_string(HTML_TEMPLATE, aliases=raw_aliases)
-    except Exception as e:
-        print(f"Ошибка в index(): {e}", file=sys.stderr)
-        return jsonify({"error": "Internal Server Error"}), 500
+    # Страница — только оболочка; категории и устройства клиент берёт из /api/aliases
+    theme = current_theme()
+    return revalidated(state_etag("index", theme, _ASSETS_STATE),
+                       lambda: render_page("index", theme))
+
+@app.route("/api/aliases")
+@requires_auth
+def get_aliases():
+    return revalidated(state_etag(file_state(ALIASES_FILE)), lambda: jsonify_ordered(load_aliases()))
 
 @app.route("/logs")
 @requires_auth
 def view_logs():
-    return render_template_string(LOGS_TEMPLATE)
+    theme = current_theme()
+    return revalidated(state_etag("logs", theme, _ASSETS_STATE),
+                       lambda: render_page("logs", theme))
 
 @app.route("/logs/api")
 @requires_auth
@@ -1030,57 +2013,176 @@ def api_logs():
             return jsonify({"error": "Номер страницы и размер должны быть положительными числами"}), 400
     except ValueError:
         return jsonify({"error": "Некорректные параметры страницы или размера"}), 400
-
-    # Загружаем ВСЕ логи, соответствующие запросу, и сортируем их (новые сверху)
-    # load_logs уже сортирует и возвращает ограниченное количество
-    # Для пагинации нужно получить ВСЕ подходящие записи, отсортировать, и выбрать нужную страницу
-    all_logs = load_logs(limit=10000, query=query) # Увеличиваем лимит для пагинации
-
-    # Теперь all_logs уже отсортирован от новых к старым
-    total_records = len(all_logs)
-
-    # Вычисляем индексы для текущей страницы (в отсортированном списке)
-    # Страница 1 -> индексы 0...page_size-1
-    # Страница 2 -> индексы page_size...2*page_size-1
+    # Ответ всегда ограничен одной страницей разумного размера — весь лог целиком не отдаётся
+    page_size = min(page_size, LOGS_MAX_PAGE_SIZE)
+
+    # Курсор: вместо номера страницы — timestamp последней показанной записи
+    before_ts = request.args.get("before_ts", "").strip()
+
+    # Пока файл логов не менялся, та же страница выдачи отдаётся как 304 без чтения файла
+    state = file_state(LOG_FILE)
+    etag = state_etag(state, query, page, page_size, before_ts)
+    if before_ts:
+        return revalidated(etag, lambda: _logs_before(query, before_ts, page_size))
+    return revalidated(etag, lambda: _logs_page(query, page, page_size, state))
+
+def logs_response(logs, page_size, **extra):
+    """Ответ /logs/api: компактные записи и курсор на следующую порцию, если эта заполнена целиком."""
+    next_before_ts = logs[-1].get("timestamp") if len(logs) == page_size else None
+    return jsonify({"logs": [compact_log(entry) for entry in logs],
+                    "next_before_ts": next_before_ts, **extra})
+
+def _logs_before(query, before_ts, page_size):
+    # Без подсчёта total: читается только порция перед курсором
+    logs = read_logs_before(before_ts, page_size, query)
+    if logs is None:
+        logs = [entry for entry in load_logs(limit=10000, query=query)
+                if entry.get("timestamp", "") < before_ts][:page_size]
+    return logs_response(logs, page_size)
+
+def _logs_page(query, page, page_size, state):
+    # log_size — до какого байта прочитан лог: с этого места /logs/stream продолжит выдачу
+    # новых записей, не пропуская и не повторяя уже показанные.
+    # Без поиска страница читается по индексу смещений, не трогая остальной лог
+    if not query:
+        result = read_log_page((page - 1) * page_size, page_size)
+        if result is not None:
+            logs, total, log_size = result
+            return logs_response(logs, page_size, total=total, log_size=log_size)
+
+    # С поиском точное число совпадений потребовало бы просмотра всего лога.
+    # Ищем только до LOGS_SEARCH_PAGES_AHEAD страниц за текущей; если упёрлись в предел,
+    # total — нижняя оценка (estimated), интерфейс покажет «N+»
     start_index = (page - 1) * page_size
-    end_index = start_index + page_size
-
-    # Получаем только логи для текущей страницы
-    logs_for_page = all_logs[start_index:end_index]
-
-    # Возвращаем объект с массивом логов и общим количеством записей
-    return jsonify({
-        "logs": logs_for_page,
-        "total": total_records
-    })
-
+    limit = start_index + page_size * LOGS_SEARCH_PAGES_AHEAD
+    found = load_logs(limit=limit, query=query, state=state, with_lines=True)
+    extra = {}
+    if page == 1 and len(found) <= page_size:
+        # Все совпадения уместились на странице — отдаём и сырые строки, по которым искал сервер:
+        # уточняющий запрос клиент отфильтрует сам по тому же тексту, без запроса к серверу
+        extra["raw"] = [line.decode("utf-8", "replace") for line, _ in found]
+
+    return logs_response([entry for _, entry in found[start_index:start_index + page_size]], page_size,
+                         total=len(found), estimated=len(found) >= limit,
+                         log_size=state[1] if state else 0, **extra)
+
+@app.route("/logs/stream")
+@requires_auth
+def logs_stream():
+    """
+    Новые записи лога через Server-Sent Events. Лог пишут и другие сервисы, но только
+    дописывают в конец, поэтому поток следит за размером файла и отдаёт дописанные строки.
+    Событие — массив компактных записей (как в /logs/api), от новых к старым;
+    событие reset — файл пересоздан, клиенту нужно перечитать страницу.
+    from — log_size из ответа /logs/api: поток продолжает ровно с конца показанной страницы.
+    """
+    query = request.args.get("query", "").strip().lower()
+    start = request.args.get("from", "").strip()
+    try:
+        start = int(start) if start else None
+    except ValueError:
+        start = -1
+    if start is not None and start < 0:
+        return jsonify({"error": "Некорректный параметр from"}), 400
+
+    def generate():
+        if start is None:
+            state = file_state(LOG_FILE)
+            pos = state[1] if state else 0
+        else:
+            # Файл короче from — его пересоздали, первый же шаг пришлёт reset
+            pos = start
+        idle = 0.0
+        # Переподключение EventSource после обрыва — не чаще чем раз в 5 с
+        yield b"retry: 5000\n\n"
+        while True:
+            time.sleep(LOGS_STREAM_POLL)
+            state = file_state(LOG_FILE)
+            size = state[1] if state else 0
+            if size < pos:
+                pos = size
+                idle = 0.0
+                yield b"event: reset\ndata: \n\n"
+                continue
+            entries = []
+            if size > pos:
+                with open(LOG_FILE, "rb") as f:
+                    f.seek(pos)
+                    data = f.read(size - pos)
+                # Недописанную последнюю строку заберём на следующем шаге
+                end = data.rfind(b"\n") + 1
+                pos += end
+                lines = [line for line in data[:end].split(b"\n") if line.strip()]
+                entries = [compact_log(entry) for entry in
+                           matching_entries(reversed(lines), query, LOGS_MAX_PAGE_SIZE)]
+            if entries:
+                idle = 0.0
+                yield b"data: " + json_dumps_compact(entries).encode("utf-8") + b"\n\n"
+                continue
+            idle += LOGS_STREAM_POLL
+            if idle >= LOGS_STREAM_PING:
+                idle = 0.0
+                yield b": ping\n\n"
+
+    # X-Accel-Buffering: nginx не копит события в буфере
+    return Response(generate(),
+                    mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+                    direct_passthrough=True)
+
+
+# Поля, которые csv.writer (QUOTE_MINIMAL) взял бы в кавычки
+_CSV_SPECIAL = re.compile(r'[,"\r\n]')
+
+def csv_field(value):
+    """
+    Одно поле CSV: в кавычках только при наличии разделителя, кавычки или перевода строки.
+    None — пустое поле, как у csv.writer.
+    """
+    if value is None:
+        return ""
+    text = value if isinstance(value, str) else str(value)
+    if _CSV_SPECIAL.search(text):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+def json_dumps_compact(data):
+    """Компактный JSON строкой: orjson, если установлен."""
+    if orjson is not None:
+        return orjson.dumps(data).decode("utf-8")
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+# Колонки выгрузки логов (заголовок CSV); порядок совпадает с format_csv_row
+EXPORT_COLUMNS = ("timestamp", "source", "user", "action", "target", "success", "details")
+
+def format_csv_row(log):
+    """Строка CSV для записи лога в порядке EXPORT_COLUMNS; details сериализуется в JSON."""
+    get = log.get
+    return (f"{csv_field(get('timestamp', ''))},{csv_field(get('source', ''))},{csv_field(get('user', ''))},"
+            f"{csv_field(get('action', ''))},{csv_field(get('target', ''))},{csv_field(get('success', ''))},"
+            f"{csv_field(json_dumps_compact(get('details', {})))}\r\n")
+
+_CSV_HEADER = (",".join(EXPORT_COLUMNS) + "\r\n").encode("utf-8")
 
 @app.route("/logs/export")
 @requires_auth
 def export_logs():
-    import io
-    import csv
     query = request.args.get("query", "").strip()
     logs = load_logs(limit=10000, query=query) # Большой лимит для экспорта
 
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["timestamp", "source", "user", "action", "target", "success", "details"])
-    for log in logs:
-        writer.writerow([
-            log.get("timestamp", ""),
-            log.get("source", ""),
-            log.get("user", ""),
-            log.get("action", ""),
-            log.get("target", ""),
-            log.get("success", ""),
-            json.dumps(log.get("details", {}), ensure_ascii=False)
-        ])
+    # Схема строки известна заранее, поэтому строки собираются готовой функцией, без csv.writer;
+    # CSV отдаётся порциями по мере формирования, а не одной большой строкой
+    def generate():
+        yield _CSV_HEADER
+        for start in range(0, len(logs), EXPORT_CHUNK_ROWS):
+            yield "".join(map(format_csv_row, logs[start:start + EXPORT_CHUNK_ROWS])).encode("utf-8")
 
     filename = "actions_filtered.csv" if query else "actions.csv"
-    return Response(output.getvalue(),
+    # Порции уже в байтах — Werkzeug передаёт их серверу без перекодирования
+    return Response(generate(),
                     mimetype="text/csv",
-                    headers={"Content-Disposition": f"attachment;filename={filename}"})
+                    headers={"Content-Disposition": f"attachment;filename={filename}"},
+                    direct_passthrough=True)
 
 @app.route("/api/export")
 @requires_auth
@@ -1088,15 +2190,79 @@ def export_aliases():
     if not os.path.exists(ALIASES_FILE):
         return jsonify({"error": "Файл не найден"}), 404
 
-    with open(ALIASES_FILE, "r", encoding="utf-8") as f:
-        data = f.read()
+    # send_file сам ставит ETag/Last-Modified, отвечает 304 на неизменённый файл
+    # и отдаёт содержимое через sendfile без чтения в память
+    response = send_file(ALIASES_FILE,
+                         mimetype="application/json",
+                         as_attachment=True,
+                         download_name="device_aliases.json",
+                         conditional=True)
+    # Слабый ETag, как у остальных маршрутов: сильный flask-compress дополнил бы алгоритмом сжатия
+    etag, _ = response.get_etag()
+    if etag:
+        response.set_etag(etag, weak=True)
+    return response
 
-    return Response(data,
-                    mimetype="application/json",
-                    headers={"Content-Disposition": "attachment;filename=device_aliases.json"})
+_IJSON_ERRORS = (ijson.JSONError,) if ijson is not None else ()
+
+_MISSING = object()
+
+def category_error(cat_name, cat_details):
+    """Текст ошибки, если категория не соответствует формату {"type", "devices": {имя: {object, property}}}."""
+    # Один проход: каждое поле достаётся один раз, устройства проверяются до первой ошибки
+    devices = _MISSING
+    if isinstance(cat_details, dict) and "type" in cat_details:
+        devices = cat_details.get("devices", _MISSING)
+    if devices is _MISSING:
+        return f"Неверный формат категории '{cat_name}'. Ожидается 'type' и 'devices'."
+    if not isinstance(devices, dict):
+        return f"Поле 'devices' в категории '{cat_name}' должно быть словарём."
+    bad_key = next((dev_key for dev_key, dev_spec in devices.items()
+                    if not (isinstance(dev_spec, dict) and "object" in dev_spec and "property" in dev_spec)),
+                   _MISSING)
+    if bad_key is not _MISSING:
+        return f"Неверный формат устройства '{bad_key}' в категории '{cat_name}'. Ожидается 'object' и 'property'."
+    return None
+
+def read_aliases_upload(stream):
+    """
+    Разбирает загруженный файл алиасов и проверяет его структуру.
+    С ijson категории проверяются по мере разбора: на первой ошибке остаток файла не читается.
+    Возвращает (данные, текст ошибки или None, размер файла в байтах).
+    """
+    if ijson is None:
+        raw = stream.read()
+        data = json_loads(raw)
+        if not isinstance(data, dict):
+            return None, "Неверный формат JSON", len(raw)
+        for cat_name, cat_details in data.items():
+            error = category_error(cat_name, cat_details)
+            if error:
+                return None, error, len(raw)
+        return data, None, len(raw)
+
+    # kvitems молча пропускает не-объект верхнего уровня — проверяем первый значимый символ сами;
+    # пробелов перед ним может быть сколько угодно, поэтому читаем порциями до первого непробельного
+    head = b""
+    while not head:
+        chunk = stream.read(64)
+        if not chunk:
+            break
+        head = chunk.lstrip()
+    stream.seek(0)
+    if not head.startswith(b"{"):
+        return None, "Неверный формат JSON", 0
+    data = {}
+    for cat_name, cat_details in ijson.kvitems(stream, "", use_float=True):
+        error = category_error(cat_name, cat_details)
+        if error:
+            return None, error, stream.tell()
+        data[cat_name] = cat_details
+    return data, None, stream.tell()
 
 @app.route("/api/import", methods=["POST"])
 @requires_auth
+@aliases_write_lock
 def import_aliases():
     if 'file' not in request.files:
         return jsonify({"error": "Файл не загружен"}), 400
@@ -1105,18 +2271,9 @@ def import_aliases():
         return jsonify({"error": "Файл не выбран"}), 400
 
     try:
-        data = json.load(file)
-        if not isinstance(data, dict):
-            return jsonify({"error": "Неверный формат JSON"}), 400
-        # Проверим, соответствует ли структура новому формату
-        for cat_name, cat_details in data.items():
-            if not isinstance(cat_details, dict) or "type" not in cat_details or "devices" not in cat_details:
-                return jsonify({"error": f"Неверный формат категории '{cat_name}'. Ожидается 'type' и 'devices'."}), 400
-            if not isinstance(cat_details["devices"], dict):
-                 return jsonify({"error": f"Поле 'devices' в категории '{cat_name}' должно быть словарём."}), 400
-            for dev_key, dev_spec in cat_details["devices"].items():
-                 if not isinstance(dev_spec, dict) or "object" not in dev_spec or "property" not in dev_spec:
-                     return jsonify({"error": f"Неверный формат устройства '{dev_key}' в категории '{cat_name}'. Ожидается 'object' и 'property'."}), 400
+        data, error, file_size = read_aliases_upload(file.stream)
+        if error:
+            return jsonify({"error": error}), 400
 
         success = save_aliases(data) # Используем новую функцию сохранения
         if success:
@@ -1125,17 +2282,18 @@ def import_aliases():
                        action="import_aliases",
                        target="device_aliases.json",
                        success=True,
-                       details={"file_size": len(json.dumps(data))})
+                       details={"file_size": file_size})
             return jsonify({"success": True})
         else:
             return jsonify({"error": "Ошибка сохранения файла"}), 500
-    except json.JSONDecodeError:
+    except (json.JSONDecodeError, *_IJSON_ERRORS):
         return jsonify({"error": "Ошибка парсинга JSON"}), 400
     except Exception as e:
         return jsonify({"error": f"Ошибка импорта: {str(e)}"}), 500
 
 @app.route("/api/category", methods=["POST"])
 @requires_auth
+@aliases_write_lock
 def add_category():
     data = request.json
     name = data.get("name")
@@ -1143,7 +2301,7 @@ def add_category():
     if not name:
         return jsonify({"error": "Имя категории обязательно"}), 400
 
-    raw = load_aliases() # Загружаем текущую структуру
+    raw = load_aliases_copy() # Копия текущей структуры для правки
 
     if name in raw:
         existing_details = raw[name]
@@ -1161,14 +2319,15 @@ def add_category():
                    target=name,
                    success=True,
                    details={"type": device_type}) # Логируем тип
-        return jsonify({"success": True})
+        return jsonify_ordered({"success": True, "category": name, "details": raw[name]})
     else:
         return jsonify({"error": "Ошибка сохранения файла"}), 500
 
 @app.route("/api/category/<name>", methods=["DELETE"])
 @requires_auth
+@aliases_write_lock
 def delete_category(name):
-    raw = load_aliases() # Загружаем текущую структуру
+    raw = load_aliases_copy() # Копия текущей структуры для правки
 
     if name not in raw:
         return jsonify({"error": "Категория не найдена"}), 404
@@ -1188,6 +2347,7 @@ def delete_category(name):
 
 @app.route("/api/device", methods=["POST"])
 @requires_auth
+@aliases_write_lock
 def add_device():
     data = request.json
     category = data.get("category")
@@ -1198,7 +2358,7 @@ def add_device():
     if not all([category, name, obj, prop]):
         return jsonify({"error": "Все поля обязательны"}), 400
 
-    raw = load_aliases() # Загружаем текущую структуру
+    raw = load_aliases_copy() # Копия текущей структуры для правки
 
     if category not in raw:
         # Создаём категорию с типом по умолчанию, если её нет
@@ -1219,12 +2379,15 @@ def add_device():
                    action="add_device",
                    target=f"{category}/{name}",
                    success=True)
-        return jsonify({"success": True})
+        # Возвращаем добавленное устройство, чтобы клиент обновил страницу без перезагрузки
+        return jsonify_ordered({"success": True, "category": category, "type": raw[category].get("type", "unknown"),
+                                "name": name, "device": raw[category]["devices"][name]})
     else:
         return jsonify({"error": "Ошибка сохранения файла"}), 500
 
 @app.route("/api/device", methods=["DELETE"])
 @requires_auth
+@aliases_write_lock
 def delete_device():
     category = request.args.get("category")
     name = request.args.get("name")
@@ -1232,7 +2395,7 @@ def delete_device():
     if not category or not name:
         return jsonify({"error": "Параметры category и name обязательны"}), 400
 
-    raw = load_aliases() # Загружаем текущую структуру
+    raw = load_aliases_copy() # Копия текущей структуры для правки
 
     if category not in raw:
         return jsonify({"error": "Категория не найдена"}), 404
@@ -1261,6 +2424,7 @@ def delete_device():
 
 @app.route("/api/device/edit", methods=["POST"])
 @requires_auth
+@aliases_write_lock
 def edit_device():
     data = request.json
     old_category = data.get("old_category")
@@ -1273,7 +2437,7 @@ def edit_device():
     if not all([old_category, old_name, new_category, new_name, obj, prop]):
         return jsonify({"error": "Все поля обязательны"}), 400
 
-    raw = load_aliases() # Загружаем текущую структуру
+    raw = load_aliases_copy() # Копия текущей структуры для правки
 
     if old_category not in raw:
         return jsonify({"error": "Старая категория не найдена"}), 404
@@ -1313,7 +2477,8 @@ def edit_device():
                    action="edit_device",
                    target=f"{old_category}/{old_name} -> {new_category}/{new_name}",
                    success=True)
-        return jsonify({"success": True})
+        return jsonify_ordered({"success": True, "category": new_category, "type": raw[new_category].get("type", "unknown"),
+                                "name": new_name, "device": raw[new_category]["devices"][new_name]})
     else:
         return jsonify({"error": "Ошибка сохранения файла"}), 500
 
@@ -1322,10 +2487,14 @@ def edit_device():
 @app.route("/update/status")
 @requires_auth
 def update_status():
-    if os.path.exists(STATUS_FILE):
-        with open(STATUS_FILE, "r") as f:
-            return jsonify(json.load(f))
-    return jsonify({"update_available": False})
+    state = file_state(STATUS_FILE)
+    if state is None:
+        return jsonify({"update_available": False})
+    # Файл статуса уже в JSON — отдаём байты как есть, без разбора и повторной сериализации
+    def build():
+        with open(STATUS_FILE, "rb") as f:
+            return Response(f.read(), mimetype="application/json")
+    return revalidated(state_etag("status", state), build)
 
 @app.route("/update/apply", methods=["POST"])
 @requires_auth
@@ -1339,5 +2508,8 @@ def apply_update():
     else:
         return jsonify({"error": "Ошибка при обновлении"}), 500
 
+# В рабочем режиме панель запускается через gunicorn (см. mcp-web-panel.service):
+#   gunicorn -k gevent -w 2 --keep-alive 30 -b 0.0.0.0:5000 web_panel:app
+# Запуск напрямую оставлен для отладки.
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=False)
\ No newline at end of file
+    app.run(host="0.0.0.0", port=5000, debug=False, threaded=True)
\ No newline at end of file